@@ -1,13 +1,13 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-import json
+import orjson
 import re
 import sys
 
 # Load match results data
 results_path = "data/processed/player_4140765_results.parquet"
-df_results = pd.read_parquet(results_path)
+df_results = pd.read_parquet(results_path, columns=["name", "draws", "startDate"])
 
 # Use a regular expression to find the number between the underscores
 match = re.search(r"player_(\d+)_results", results_path)
@@ -22,7 +22,7 @@ else:
 df_results["event_name"] = df_results["name"]
 
 # Ensure 'draws' is a list, not a string
-df_results["draws"] = df_results["draws"].apply(lambda x: json.loads(x) if isinstance(x, str) else x)
+df_results["draws"] = [orjson.loads(x) if isinstance(x, (bytes, str)) else x for x in df_results["draws"].to_numpy()]
 
 # Verify the conversion
 print(df_results["draws"].apply(lambda x: type(x)).value_counts())  # Should show <class 'list'> only
@@ -35,70 +35,67 @@ def clean_event_name(name):
     name = re.sub(r"\s+", " ", name)  # Replace multiple spaces with a single space
     return name.strip()
 
-def extract_winner_info(draws):
-    """Extracts 'isWinner' from 'draw' inside 'results'."""
+def extract_match_info(draws, player_id):
+    """Walks 'draws' once and returns (isWinner, match type, player UTR display)."""
+    is_winner = False
+    match_type = "Singles"
+    utr_value = "Unknown"
+    found_winner = found_utr = False
     if isinstance(draws, list) and draws:
+        # Match type comes from the first result's players, as before
+        if draws[0]["results"][0]["players"].get("winner2"):
+            match_type = "Doubles"
         for draw_entry in draws:
-            if "results" in draw_entry and isinstance(draw_entry["results"], list):
-                for result in draw_entry["results"]:
-                    if "draw" in result and isinstance(result["draw"], dict):
-                        is_winner = result["draw"].get("isWinner", "Unknown")
-                        return is_winner
-    return False
-
-def extract_utr_rating(draws, player_id):
-    """Extracts 'myUtrDoublesDisplay' or 'myUtrSinglesDisplay' from 'players' inside 'results'."""
-    if isinstance(draws, list) and draws:
-        for draw_entry in draws:
-            if "results" in draw_entry and isinstance(draw_entry["results"], list):
-                for result in draw_entry["results"]:
-                    if "players" in result and isinstance(result["players"], dict):
-                        # print(f"\nPlayers data: {json.dumps(result['players'], indent=2)}")  # Debugging
-
-                        # Determine if it's singles or doubles based on "winner2"
-                        match_type = "Doubles" if result["players"].get("winner2") and result["players"]["winner2"].get("id") else "Singles"
-                        print(f"\n ---=== Match Type Detected: {match_type} ===---")
-
-                        for key, player in result["players"].items():
-                            if player is None:
-                                continue
-
-                            print(f"Checking player ID: {player.get('id')} against {player_id}")  # Debugging
-
-                            if str(player.get("id")) == str(player_id):  # Ensure IDs match as strings
-                                utr_value = player.get(
-                                    "myUtrDoublesDisplay" if match_type == "Doubles" else "myUtrSinglesDisplay",
-                                    "Unknown"
-                                )
-                                print(f"Found matching player! Returning UTR: {utr_value}")  # Debugging
-                                return utr_value
-    print("No matching player found.")
-    return "Unknown"
+            if "results" not in draw_entry or not isinstance(draw_entry["results"], list):
+                continue
+            for result in draw_entry["results"]:
+                if not found_winner and "draw" in result and isinstance(result["draw"], dict):
+                    is_winner = result["draw"].get("isWinner", "Unknown")
+                    found_winner = True
+                if not found_utr and "players" in result and isinstance(result["players"], dict):
+                    players = result["players"]
+                    # Determine if it's singles or doubles based on "winner2"
+                    result_type = "Doubles" if players.get("winner2") and players["winner2"].get("id") else "Singles"
+                    for player in players.values():
+                        if player is not None and str(player.get("id")) == str(player_id):  # Ensure IDs match as strings
+                            utr_value = player.get(
+                                "myUtrDoublesDisplay" if result_type == "Doubles" else "myUtrSinglesDisplay",
+                                "Unknown"
+                            )
+                            found_utr = True
+                            break
+                if found_winner and found_utr:
+                    return is_winner, match_type, utr_value
+    return is_winner, match_type, utr_value
 
 # Apply cleaning function
 df_results["event_name"] = df_results["event_name"].apply(clean_event_name)
 
-# Determine win/loss status
-df_results["win"] = df_results["draws"].apply(extract_winner_info)
-
-# Extract match type (singles or doubles)
-df_results["match_type"] = df_results.apply(
-    lambda row: "Doubles" if row["draws"][0]["results"][0]["players"].get("winner2") else "Singles", axis=1
+# Determine win/loss status, match type (singles or doubles) and UTR rating in a single pass
+df_results[["win", "match_type", "playerRating"]] = pd.DataFrame(
+    [extract_match_info(draws, player_id) for draws in df_results["draws"].to_numpy()],
+    index=df_results.index,
 )
 
-# Extract UTR rating
-df_results["playerRating"] = df_results.apply(
-    lambda row: extract_utr_rating(row["draws"], player_id), axis=1
-)
+# UTR displays come back as strings ("12.34" or "Unknown"); convert once so plots work on floats
+df_results["playerRating"] = pd.to_numeric(df_results["playerRating"], errors="coerce")
+
+# Dictionary-encode the repetitive columns used for filtering, counting and plotting
+df_results = df_results.astype({"event_name": "category", "match_type": "category", "win": "category"})
 
 # Print unique event names for verification
 print(df_results["event_name"].value_counts().sort_values(ascending=False))
 
+# Split once and reuse the subsets and tournament order across all plots
+singles = df_results[df_results["match_type"] == "Singles"]
+doubles = df_results[df_results["match_type"] == "Doubles"]
+event_order = df_results["event_name"].value_counts().index
+
 # Plot Wins vs Losses by Tournament (Singles)
 plt.figure(figsize=(12, 6))
-sns.countplot(y=df_results[df_results["match_type"] == "Singles"]["event_name"],
-              hue=df_results[df_results["match_type"] == "Singles"]["win"],
-              order=df_results["event_name"].value_counts().index)
+sns.countplot(y=singles["event_name"],
+              hue=singles["win"],
+              order=event_order)
 plt.title("Win/Loss Distribution by Tournament (Singles)")
 plt.xlabel("Number of Matches")
 plt.ylabel("Tournament Name")
@@ -107,9 +104,9 @@ plt.show()
 
 # Plot Wins vs Losses by Tournament (Doubles)
 plt.figure(figsize=(12, 6))
-sns.countplot(y=df_results[df_results["match_type"] == "Doubles"]["event_name"],
-              hue=df_results[df_results["match_type"] == "Doubles"]["win"],
-              order=df_results["event_name"].value_counts().index)
+sns.countplot(y=doubles["event_name"],
+              hue=doubles["win"],
+              order=event_order)
 plt.title("Win/Loss Distribution by Tournament (Doubles)")
 plt.xlabel("Number of Matches")
 plt.ylabel("Tournament Name")
@@ -118,8 +115,8 @@ plt.show()
 
 # Plot UTR Progress Over Time (Singles)
 plt.figure(figsize=(10, 5))
-sns.lineplot(x=pd.to_datetime(df_results[df_results["match_type"] == "Singles"]["startDate"]),
-             y=df_results[df_results["match_type"] == "Singles"]["playerRating"],
+sns.lineplot(x=pd.to_datetime(singles["startDate"]),
+             y=singles["playerRating"],
              marker="o")
 plt.xlabel("Date")
 plt.ylabel("Player UTR")
@@ -129,8 +126,8 @@ plt.show()
 
 # Plot UTR Progress Over Time (Doubles)
 plt.figure(figsize=(10, 5))
-sns.lineplot(x=pd.to_datetime(df_results[df_results["match_type"] == "Doubles"]["startDate"]),
-             y=df_results[df_results["match_type"] == "Doubles"]["playerRating"],
+sns.lineplot(x=pd.to_datetime(doubles["startDate"]),
+             y=doubles["playerRating"],
              marker="o")
 plt.xlabel("Date")
 plt.ylabel("Player UTR")
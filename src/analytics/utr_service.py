@@ -1,164 +1,277 @@
 import pandas as pd
-import json
-from datetime import datetime
+import numpy as np
+from datetime import datetime, date
 from data_access import load_player_results, load_player_stats, load_player_profile
-import os
 import re
 import logging
+from functools import lru_cache
 
 DATA_DIR = "data/processed"
 RAW_DIR = "data/raw"
 
+# Only these columns are read from the parquet files
+RESULTS_COLUMNS = ['event_id', 'players', 'date', 'event_name']
+PROFILE_COLUMNS = ['firstName', 'lastName']
+
 # Get a logger instance for this module
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=256)
+def _cached_profile_tag(player_id):
+    """Loads a player's profile once per process and keeps only the "F.Last" name tag."""
+    player_profile = load_player_profile(player_id, columns=PROFILE_COLUMNS)
+    if player_profile is None or player_profile.empty:
+        return None
+    first_name = player_profile['firstName'].iat[0]
+    last_name = player_profile['lastName'].iat[0]
+    return f"{first_name[0]}.{last_name}"
+
+class _StatsNotLoaded(Exception):
+    """Raised inside the stats cache so failed loads are not cached."""
+
+@lru_cache(maxsize=256)
+def _load_stats(player_id, match_type):
+    stats = load_player_stats(player_id, match_type)
+    if stats is None:
+        raise _StatsNotLoaded
+    return stats
+
+def _cached_stats(player_id, match_type):
+    """Loads a player's singles or doubles stats once per process, retrying loads that failed."""
+    try:
+        return _load_stats(player_id, match_type)
+    except _StatsNotLoaded:
+        return None
+
 def player_id_lookup(player_id, player_name):
     """Looks up the player ID based on the player name."""
-    logger.debug(f"Looking up player ID '{player_id}' for name '{player_name}'.")
+    logger.debug("Looking up player ID '%s' for name '%s'.", player_id, player_name)
     try:
-        # 1. Load player profile
-        player_profile = load_player_profile(player_id)
-        if player_profile is None:
-            logger.warning(f"Could not load profile for player ID '{player_id}' during lookup for name '{player_name}'.")
+        # 1. Load the player's cached name tag
+        player_tag = _cached_profile_tag(player_id)
+        if player_tag is None:
+            logger.warning("Could not load profile for player ID '%s' during lookup for name '%s'.", player_id, player_name)
             return None
-        # 2. Extract player name
-        first_name = player_profile['firstName'][0]
-        last_name = player_profile['lastName'][0]
-        # 3. Compare player name with extracted name
-        if player_name == f"{first_name[0]}.{last_name}":
-            logger.debug(f"Found matching player ID '{player_id}' for name '{player_name}'.")
+        # 2. Compare player name with the tag
+        if player_name == player_tag:
+            logger.debug("Found matching player ID '%s' for name '%s'.", player_id, player_name)
             return player_id
         else:
-            logger.debug(f"Player name '{player_name}' does not match profile for ID '{player_id}'.")
+            logger.debug("Player name '%s' does not match profile for ID '%s'.", player_name, player_id)
             return None
     except Exception as e:
-        logger.exception(f"An unexpected error occurred while looking up player ID '{player_id}' for name '{player_name}': {e}")
+        logger.exception("An unexpected error occurred while looking up player ID '%s' for name '%s': %s", player_id, player_name, e)
+        return None
+
+@lru_cache(maxsize=256)
+def _singles_trend_index(player_id):
+    """Indexes the player's singles rating trend chart once as {match date: ratingDisplay}."""
+    stats = _cached_stats(player_id, "singles")
+    if stats is None:
+        logger.warning("Could not load singles stats for player '%s'.", player_id)
+        return {}
+    trend_chart = stats.get("ratingTrendChart", {})
+    if not trend_chart or not trend_chart.get("months"):
+        logger.warning("Rating trend chart or months not found in singles stats for player '%s'.", player_id)
+        return {}
+    index = {}
+    for month in trend_chart["months"]:
+        if not month.get("results") or not month.get("ratings"):
+            continue
+        # Some players' charts only carry the raw rating; skip months without a display value
+        rating_display = next((rating["ratingDisplay"] for rating in month["ratings"] if rating.get("ratingDisplay")), None)
+        if rating_display is None:
+            continue
+        for result in month['results']:
+            result_date = date.fromisoformat(result['descriptions'][0]['resultDate'][:10])
+            index.setdefault(result_date, rating_display)
+    logger.debug("Indexed %s singles trend chart results for player '%s'.", len(index), player_id)
+    return index
+
+# Patterns for the doubles trend chart "details" strings, e.g.
+# "Tue Aug 27 Win C.Lynch/J.Milton (2.72/1.96) vs. C.Smith/P.Gibson (2.17/2.71) 6-3, 3-6, 1-0"
+_DATE_RE = re.compile(r"^(Sun|Mon|Tue|Wed|Thu|Fri|Sat)\s([A-Za-z]{3})\s(\d{1,2})", re.ASCII)
+_UTR_RE = re.compile(r"\((\d+\.\d+)/(\d+\.\d+)\)", re.ASCII)
+_NAME_RE = re.compile(r"([A-Z]\.[A-Za-z]+)", re.ASCII)
+_MONTH_ABBR = {'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+               'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12}
+
+@lru_cache(maxsize=256)
+def _doubles_trend_index(player_id):
+    """Parses the player's doubles rating trend chart once into {match date: (details, names, utrs)}."""
+    stats = _cached_stats(player_id, "doubles")
+    if stats is None:
+        logger.warning("Could not load doubles stats for player '%s'.", player_id)
+        return {}
+    trend_chart = stats.get("ratingTrendChart", {})
+    if not trend_chart or not trend_chart.get("months"):
+        logger.warning("Rating trend chart or months not found in doubles stats for player '%s'.", player_id)
+        return {}
+    # The chart only shows month/day; anything after the current month is from last year
+    today = datetime.now()
+    index = {}
+    for month in trend_chart['months']:
+        for result in month.get('results') or []:
+            details = result['descriptions'][0]['details']
+            # The date is the cheap, selective part; only parse UTRs and names for new dates
+            date_match = _DATE_RE.search(details)
+            if not date_match:
+                logger.warning("Skipped doubles match due to missing date information: %s", details)
+                continue
+            day_of_week, month_abbr, day = date_match.groups()
+            month_num = _MONTH_ABBR.get(month_abbr.title())
+            if month_num is None:
+                logger.warning("Skipped doubles match with unknown month '%s': %s", month_abbr, details)
+                continue
+            year = today.year
+            if month_num > today.month:
+                year -= 1
+            try:
+                row_date_obj = date(year, month_num, int(day))
+            except ValueError:
+                logger.warning("Skipped doubles match with invalid date '%s %s': %s", month_abbr, day, details)
+                continue
+            # Keep the first entry for a date, matching the original scan order
+            if row_date_obj in index:
+                continue
+
+            utr_matches = _UTR_RE.findall(details)
+            name_matches = _NAME_RE.findall(details)
+            if len(utr_matches) < 2 or len(name_matches) < 4:
+                logger.warning("Skipped doubles match due to missing UTR/name information: %s", details)
+                continue
+            index[row_date_obj] = (details, name_matches, utr_matches)
+    logger.debug("Indexed %s doubles trend chart results for player '%s'.", len(index), player_id)
+    return index
+
+class PlayerUTRResolver:
+    """Resolves a player's own UTR for any match date from trend chart indexes built once."""
+
+    def __init__(self, player_id):
+        self.player_id = player_id
+        # Each index is built on its own so a bad singles chart can't take doubles lookups down with it
+        self.singles = self._build_index("singles", _singles_trend_index)
+        self.doubles = self._build_index("doubles", self._own_doubles_utrs)
+        logger.debug("Resolver for player '%s' holds %s singles and %s doubles UTRs.", player_id, len(self.singles), len(self.doubles))
+
+    def _build_index(self, match_type, build):
+        """Runs one index builder, logging a failure once and falling back to an empty index."""
+        try:
+            return build(self.player_id)
+        except Exception as e:
+            logger.exception("Could not index %s trend chart for player '%s': %s", match_type, self.player_id, e)
+            return {}
+
+    def _own_doubles_utrs(self, player_id):
+        """Maps each doubles match date to the player's own UTR from the parsed trend chart."""
+        doubles = {}
+        doubles_index = _doubles_trend_index(player_id)
+        # Only players with doubles results need their profile to recognise themselves
+        self_tag = self._self_tag() if doubles_index else None
+        if self_tag is not None:
+            for match_date, (details, name_matches, utr_matches) in doubles_index.items():
+                utr = self._own_doubles_utr(self_tag, details, name_matches, utr_matches)
+                if utr is not None:
+                    doubles[match_date] = utr
+        return doubles
+
+    def _self_tag(self):
+        """Returns the player's "F.Last" name as it appears in doubles details strings."""
+        self_tag = _cached_profile_tag(self.player_id)
+        if self_tag is None:
+            logger.warning("Could not load profile for player ID '%s'; doubles UTRs cannot be matched.", self.player_id)
+        return self_tag
+
+    def _own_doubles_utr(self, self_tag, details, name_matches, utr_matches):
+        """Picks the player's UTR out of a doubles result by comparing the four names to self_tag."""
+        if name_matches[0] == self_tag:
+            return utr_matches[0][0]
+        elif name_matches[1] == self_tag:
+            return utr_matches[0][1]
+        elif name_matches[2] == self_tag:
+            return utr_matches[1][0]
+        elif name_matches[3] == self_tag:
+            return utr_matches[1][1]
+        logger.debug("Player ID '%s' not found among the players in the details: %s", self.player_id, details)
         return None
 
-def get_match_utr(player_id, match_data, match_type):
-    """Retrieves the player's UTR for a specific match."""
-    logger.debug(f"Getting UTR for player '{player_id}', match: {match_data.get('descriptions')}, type: '{match_type}'.")
+    def lookup(self, match_date, match_type):
+        """Returns the player's UTR on match_date for 'singles' or 'doubles', or None."""
+        return (self.singles if match_type == "singles" else self.doubles).get(match_date)
+
+@lru_cache(maxsize=256)
+def _player_resolver(player_id):
+    """Builds one PlayerUTRResolver per player and reuses it for every match."""
+    return PlayerUTRResolver(player_id)
+
+def clear_caches():
+    """Drops every cached profile, stats payload, trend index and resolver.
+
+    Callers that save new profile or stats data and then read it back in the same process
+    must call this first; the lru caches can only be cleared as a whole.
+    """
+    for cached in (_cached_profile_tag, _load_stats, _singles_trend_index, _doubles_trend_index, _player_resolver):
+        cached.cache_clear()
+
+def get_match_utr(player_id, result_date, details, match_type):
+    """Retrieves the player's UTR for a specific match.
+
+    result_date may be a date or an ISO-8601 string; details is only used for logging.
+    """
+    logger.debug("Getting UTR for player '%s', match: %s %s, type: '%s'.", player_id, result_date, details, match_type)
     try:
-        if match_type == "singles":
-            # singles logic
-            logger.debug(f"Processing singles match for player '{player_id}'.")
-            stats = load_player_stats(player_id, match_type)
-            if stats is None:
-                logger.warning(f"Could not load singles stats for player '{player_id}'.")
-                return None
-            trend_chart = stats.get("ratingTrendChart", {})
-            if not trend_chart or not trend_chart.get("months"):
-                logger.warning(f"Rating trend chart or months not found in singles stats for player '{player_id}'.")
-                return None
-            match_date_str = match_data['descriptions'][0]['resultDate'].split('T')[0]
-            match_date_obj = datetime.strptime(match_date_str, "%Y-%m-%d").date()
-            logger.debug(f"Looking for UTR on match date: {match_date_obj} for player '{player_id}'.")
-            for month in trend_chart["months"]:
-                if month.get("results"):
-                    for result in month['results']:
-                        result_date = datetime.strptime(result['descriptions'][0]['resultDate'].split('T')[0], "%Y-%m-%d").date()
-                        if result_date == match_date_obj:
-                            for rating in month['ratings']:
-                                logger.debug(f"Found UTR {rating['ratingDisplay']} for player {player_id} on match date {match_date_obj}.")
-                                return rating['ratingDisplay']
-            logger.info(f"UTR not found for player '{player_id}' on match date {match_date_obj} (singles).")
-            return None
-        else:  # doubles
-            # doubles logic from json file
-            logger.debug(f"Processing doubles match for player '{player_id}'.")
-            stats = load_player_stats(player_id, match_type)
-            if stats is None:
-                logger.warning(f"Could not load doubles stats for player '{player_id}'.")
-                return None
-            trend_chart = stats.get("ratingTrendChart", {})
-            if not trend_chart or not trend_chart.get("months"):
-                logger.warning(f"Rating trend chart or months not found in doubles stats for player '{player_id}'.")
-                return None
-            match_date_str = match_data['descriptions'][0]['resultDate'].split('T')[0]
-            match_date_obj = datetime.strptime(match_date_str, "%Y-%m-%d").date()
-            logger.debug(f"Looking for UTR on match date: {match_date_obj} (doubles) for player '{player_id}'.")
-            for month in trend_chart['months']:
-                if month.get('results'):
-                    for result in month['results']:
-                        details = result['descriptions'][0]['details']
-                        date_match = re.search(r"^(Sun|Mon|Tue|Wed|Thu|Fri|Sat)\s([A-Za-z]{3})\s(\d{1,2})", details)
-                        utr_matches = re.findall(r"\((\d+\.\d+)/(\d+\.\d+)\)", details)
-                        name_matches = re.findall(r"([A-Z]\.[A-Za-z]+)", details)
-
-                        if date_match and utr_matches and name_matches:
-                            day_of_week, month_abbr, day = date_match.groups()
-                            year = datetime.now().year
-                            if datetime.strptime(month_abbr, '%b').month > datetime.now().month:
-                                year -= 1
-                            row_date_str = f"{year}-{datetime.strptime(month_abbr, '%b').month:02d}-{int(day):02d}"
-                            row_date_obj = datetime.strptime(row_date_str, "%Y-%m-%d").date()
-                            if row_date_obj == match_date_obj:
-                                p1_name = name_matches[0]
-                                p2_name = name_matches[1]
-                                p3_name = name_matches[2]
-                                p4_name = name_matches[3]
-                                utr1 = utr_matches[0][0]
-                                utr2 = utr_matches[0][1]
-                                utr3 = utr_matches[1][0]
-                                utr4 = utr_matches[1][1]
-                                logger.debug(f"Found potential UTRs for match on {match_date_obj}: ({p1_name}: {utr1}/{p2_name}: {utr2}), ({p3_name}: {utr3}/{p4_name}: {utr4})")
-                                if player_id in [player_id_lookup(player_id, name_matches[0]), player_id_lookup(player_id, name_matches[1])]:
-                                    if player_id == player_id_lookup(player_id, name_matches[0]):
-                                        logger.debug(f"Returning UTR '{utr1}' for player '{player_id}' (matched with '{p1_name}').")
-                                        return utr_matches[0][0]
-                                    else:
-                                        logger.debug(f"Returning UTR '{utr2}' for player '{player_id}' (matched with '{p2_name}').")
-                                        return utr_matches[0][1]
-                                elif player_id in [player_id_lookup(player_id, name_matches[2]), player_id_lookup(player_id, name_matches[3])]:
-                                    if player_id == player_id_lookup(player_id, name_matches[2]):
-                                        logger.debug(f"Returning UTR '{utr3}' for player '{player_id}' (matched with '{p3_name}').")
-                                        return utr_matches[1][0]
-                                    else:
-                                        logger.debug(f"Returning UTR '{utr4}' for player '{player_id}' (matched with '{p4_name}').")
-                                        return utr_matches[1][1]
-                                else:
-                                    logger.debug(f"Player ID '{player_id}' not found among the players in the details: {details}")
-                                    return None
-                        else:
-                            logger.warning(f"Skipped doubles match due to missing date/UTR/name information: {details}")
-                            return None
-            logger.info(f"UTR not found for player '{player_id}' on match date {match_date_obj} (doubles).")
-            return None
+        # Callers iterating a results frame pass dates already parsed in bulk
+        match_date_obj = result_date if isinstance(result_date, date) else date.fromisoformat(result_date[:10])
+        utr = _player_resolver(player_id).lookup(match_date_obj, match_type)
+        if utr is not None:
+            logger.debug("Found UTR %s for player %s on match date %s (%s).", utr, player_id, match_date_obj, match_type)
+            return utr
+        logger.info("UTR not found for player '%s' on match date %s (%s).", player_id, match_date_obj, match_type)
+        return None
     except Exception as e:
-        logger.exception(f"An unexpected error occurred while retrieving match UTR for player '{player_id}': {e}")
+        logger.exception("An unexpected error occurred while retrieving match UTR for player '%s': %s", player_id, e)
         return None
 
+def _singles_mask(players):
+    """Flags singles matches, i.e. rows whose players have an explicit null second winner.
+
+    Results files store players as JSON text, which is scanned as a substring instead of
+    being decoded; both the json.dumps and compact orjson spellings are matched.
+    """
+    return (players.str.contains('"winner2": null', regex=False, na=False)
+            | players.str.contains('"winner2":null', regex=False, na=False))
+
 def get_player_utr_scores(player_id):
     """Fetches and returns the singles and doubles UTR scores for a player."""
-    logger.info(f"Fetching UTR scores for player '{player_id}'.")
+    logger.info("Fetching UTR scores for player '%s'.", player_id)
     try:
-        results_df = load_player_results(player_id)
+        results_df = load_player_results(player_id, columns=RESULTS_COLUMNS)
         if results_df is None or results_df.empty:
-            logger.warning(f"No results found for player '{player_id}', cannot calculate UTR.")
+            logger.warning("No results found for player '%s', cannot calculate UTR.", player_id)
             return {}
 
         match_utrs = {}
 
-        for index, row in results_df.iterrows():
-            match_id = row['event_id']
-            players_json_str = row['players']
-            match_data = json.loads(players_json_str)
-            if match_data["winner2"] is None:
-                match_type = "singles"
-            else:
-                match_type = "doubles"
-            logger.debug(f"Processing match ID '{match_id}' of type '{match_type}' for player '{player_id}'.")
-
-            date = row['date']
-            event_name = row['event_name']
-            utr = get_match_utr(player_id, {"descriptions": [{"resultDate": date, "details": event_name}]}, match_type)
+        is_singles = _singles_mask(results_df['players'])
+        match_types = np.where(is_singles, "singles", "doubles").tolist()
+        # Parse the whole date column once instead of once per get_match_utr call
+        match_dates = pd.to_datetime(results_df['date'].str.slice(0, 10), format="%Y-%m-%d", errors="coerce").dt.date
+        rows = results_df[['event_id', 'date', 'event_name']].itertuples(index=False, name=None)
+
+        for (match_id, date_str, event_name), match_date, match_type in zip(rows, match_dates, match_types):
+            logger.debug("Processing match ID '%s' of type '%s' for player '%s'.", match_id, match_type, player_id)
+            if pd.isna(match_date):
+                logger.warning("Skipping match ID '%s' with unparseable date '%s'.", match_id, date_str)
+                continue
+
+            utr = get_match_utr(player_id, match_date, event_name, match_type)
             if utr is not None:
-                match_utrs[match_id] = {"utr": utr, "date": date}
+                match_utrs[match_id] = {"utr": utr, "date": date_str}
 
-        logger.info(f"Match UTRs calculated for player {player_id}")
-        logger.debug(f"{match_utrs}")
+        logger.info("Match UTRs calculated for player %s", player_id)
+        logger.debug("%s", match_utrs)
         return match_utrs
 
     except Exception as e:
-        logger.error(f"Error calculating UTR for player {player_id}: {e}")
+        logger.error("Error calculating UTR for player %s: %s", player_id, e)
         return None
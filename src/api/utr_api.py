@@ -1,7 +1,15 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 import logging
-from urllib.parse import quote
+import sqlite3
+import threading
+import time
+import functools
+import orjson
+from collections import OrderedDict
+from urllib.parse import quote, urlencode
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -10,32 +18,142 @@ load_dotenv()
 # Get a logger instance for this module
 logger = logging.getLogger(__name__)
 
+# Response caching is off unless UTR_CACHE_TTL (seconds) is set
+CACHE_TTL = float(os.getenv("UTR_CACHE_TTL", "0"))
+CACHE_PATH = os.getenv("UTR_CACHE_PATH", ".utr_cache.sqlite")
+# Most recently used response bodies kept in memory; older ones are still served from disk
+MEMORY_CACHE_SIZE = 256
+
+# How long a successful login is trusted before logging in again (seconds)
+SESSION_TTL = 1800
+
+def cached_response(endpoint):
+    """Memoizes a UTRAPI raw body getter in memory and on disk for the instance's cache_ttl seconds."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.cache_ttl <= 0:
+                return method(self, *args, **kwargs)
+            key = ":".join([endpoint, *map(str, args), *(f"{k}={v}" for k, v in sorted(kwargs.items()))])
+            cached = self._cache_get(key)
+            if cached is not None:
+                logger.debug("Cache hit for %s", key)
+                return cached
+            value = method(self, *args, **kwargs)
+            # Failed fetches return None and are never cached
+            if value is not None:
+                self._cache_put(key, value)
+            return value
+        return wrapper
+    return decorator
+
 class UTRAPI:
     """Handles authentication and API calls to UTR Sports."""
 
-    # BASE_URL = "https://app.utrsports.net"
-    # API_URL = "https://api.utrsports.net"
-    # SEARCH_URL = f"{API_URL}/v2/search/players"
-    # PROFILE_URL = f"{API_URL}/v1/player/{{player_id}}/profile"
-    # RESULTS_URL = f"{API_URL}/v4/player/{{player_id}}/results"
-    # STATS_URL = f"{API_URL}/v4/player/{{player_id}}/all-stats"
+    BASE_URL = "https://app.utrsports.net"
+    API_URL = "https://api.utrsports.net"
+    SEARCH_URL = f"{API_URL}/v2/search/players"
+
+    @staticmethod
+    def _profile_url(player_id):
+        """Builds the profile endpoint URL for a player."""
+        return f"{UTRAPI.API_URL}/v1/player/{player_id}/profile"
+
+    @staticmethod
+    def _results_url(player_id):
+        """Builds the results endpoint URL for a player."""
+        return f"{UTRAPI.API_URL}/v4/player/{player_id}/results"
+
+    @staticmethod
+    def _stats_url(player_id):
+        """Builds the stats endpoint URL for a player."""
+        return f"{UTRAPI.API_URL}/v4/player/{player_id}/all-stats"
 
     def __init__(self):
-        self.app_url = "https://app.utrsports.net"
-        self.api_url = "https://api.utrsports.net"
-        self.search_url = f"{self.api_url}/v2/search/players"
-        self.profile_url = f"{self.api_url}/v1/player/{{player_id}}/profile"
-        self.results_url = f"{self.api_url}/v4/player/{{player_id}}/results"
-        self.stats_url = f"{self.api_url}/v4/player/{{player_id}}/all-stats"
         self.session = requests.Session()
+        # Keep connections alive across calls and retry transient failures with backoff
+        retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+        self.session.mount("https://", adapter)
         self.email = os.getenv("UTR_API_EMAIL")
         self.password = os.getenv("UTR_API_PASS")
         self.authenticated = False
+        self._auth_expires_at = 0.0
+        self._auth_lock = threading.Lock()
+        self.cache_ttl = CACHE_TTL
+        self.cache_path = CACHE_PATH
+        self._memory_cache = OrderedDict()
+        self._cache_conn = None
+        self._cache_lock = threading.Lock()
+
+    def _cache_db(self):
+        """Opens the on-disk response cache on first use."""
+        if self._cache_conn is None:
+            self._cache_conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+            self._cache_conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, ts REAL, blob BLOB)")
+            self._cache_conn.execute("CREATE TABLE IF NOT EXISTS etags (url TEXT PRIMARY KEY, etag TEXT, body BLOB)")
+        return self._cache_conn
+
+    def _remember(self, key, ts, body):
+        """Keeps a body in the in-memory cache, evicting the least recently used past MEMORY_CACHE_SIZE."""
+        self._memory_cache[key] = (ts, body)
+        self._memory_cache.move_to_end(key)
+        while len(self._memory_cache) > MEMORY_CACHE_SIZE:
+            self._memory_cache.popitem(last=False)
+
+    def _cache_get(self, key):
+        """Returns a cached body younger than cache_ttl, checking memory before disk."""
+        oldest = time.time() - self.cache_ttl
+        with self._cache_lock:
+            hit = self._memory_cache.pop(key, None)
+            if hit is not None and hit[0] > oldest:
+                self._memory_cache[key] = hit
+                return hit[1]
+            row = self._cache_db().execute("SELECT ts, blob FROM cache WHERE key = ? AND ts > ?", (key, oldest)).fetchone()
+            if row is None:
+                return None
+            self._remember(key, row[0], row[1])
+            return row[1]
+
+    def _cache_put(self, key, body):
+        """Stores a raw body in memory and on disk."""
+        now = time.time()
+        with self._cache_lock:
+            self._remember(key, now, body)
+            conn = self._cache_db()
+            conn.execute("INSERT OR REPLACE INTO cache (key, ts, blob) VALUES (?, ?, ?)", (key, now, body))
+            conn.commit()
+
+    def _fetch(self, url, params=None):
+        """GETs url and returns the raw body, revalidating with If-None-Match when caching is on."""
+        kwargs = {} if params is None else {"params": params}
+        if self.cache_ttl <= 0:
+            response = self.session.get(url, **kwargs)
+            response.raise_for_status()
+            return response.content
+
+        url_key = url if params is None else f"{url}?{urlencode(sorted(params.items()))}"
+        with self._cache_lock:
+            stored = self._cache_db().execute("SELECT etag, body FROM etags WHERE url = ?", (url_key,)).fetchone()
+        if stored is not None:
+            kwargs["headers"] = {"If-None-Match": stored[0]}
+        response = self.session.get(url, **kwargs)
+        if stored is not None and response.status_code == 304:
+            logger.debug("Not modified, reusing cached body for %s", url_key)
+            return stored[1]
+        response.raise_for_status()
+        etag = response.headers.get("ETag")
+        if etag:
+            with self._cache_lock:
+                conn = self._cache_db()
+                conn.execute("INSERT OR REPLACE INTO etags (url, etag, body) VALUES (?, ?, ?)", (url_key, etag, response.content))
+                conn.commit()
+        return response.content
 
     def _authenticate(self):
         """Logs into UTR Sports API."""
-        self.session.get(self.app_url)
-        auth_url = f"{self.app_url}/api/v1/auth/login"
+        self.session.get(self.BASE_URL)
+        auth_url = f"{self.BASE_URL}/api/v1/auth/login"
         headers={"content-type": "application/json", "accept": "application/json"}
         payload={"email": self.email, "password": self.password}
         try:
@@ -43,49 +161,53 @@ class UTRAPI:
             response.raise_for_status()  # Raise an exception for bad status codes
             logger.debug("Login successful.")
             self.authenticated = True
+            self._auth_expires_at = time.monotonic() + SESSION_TTL
             return True
         except requests.exceptions.RequestException as e:
-            logger.warning(f"Login failed: {response.status_code if 'response' in locals() else 'No Response'} - {e}")
+            logger.warning("Login failed: %s - %s", response.status_code if 'response' in locals() else 'No Response', e)
             return False
 
     def _ensure_authenticated(self):
-        """Ensures session is still valid."""
-        if not self.authenticated:
+        """Ensures session is still valid, logging in again once it has expired."""
+        if self.authenticated and time.monotonic() < self._auth_expires_at:
+            return True
+        with self._auth_lock:
+            # Another thread may have logged in while this one waited for the lock
+            if self.authenticated and time.monotonic() < self._auth_expires_at:
+                return True
             logger.info("Session expired or not initialized. Re-authenticating...")
-            return self._authenticate
-        return True
+            self.authenticated = False
+            return self._authenticate()
 
-    def search_player(self, name):
-        """Search for a player by name."""
+    def search_player(self, name, limit=40):
+        """Search for a player by name, asking the server for at most limit hits."""
         if not self._ensure_authenticated():
             logger.error("Re-authentication failed. Cannot perform search.")
             return None
 
-        params={"query": name, "top": 40, "skip": 0, "utrType": "verified", "utrTeamType": "singles", "searchOrigin": "searchPage"}
-        logger.debug(f"Searching for player '{name}' at: {self.search_url} with params: {params}")
+        params={"query": name, "top": limit, "skip": 0, "utrType": "verified", "utrTeamType": "singles", "searchOrigin": "searchPage"}
+        logger.debug("Searching for player '%s' at: %s with params: %s", name, self.SEARCH_URL, params)
         try:
-            response = self.session.get(self.search_url, params=params)
+            response = self.session.get(self.SEARCH_URL, params=params)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             players = data.get("hits", [])
-            player_list = []
-            for p in players:
-                source = p.get("source", {})
-                if not source:
-                    continue
-                location_data = source.get("location", {})
-                location_display = location_data.get("display", "Unknown Location") if location_data else "Unknown Location"
-                player_list.append({
+            # Hits without a source are skipped by the walrus filter
+            player_list = [
+                {
                     "displayName": source.get("displayName", "Unknown"),
                     "id": source.get("id"),
-                    "location": location_display,
-                    })
+                    "location": (source.get("location") or {}).get("display", "Unknown Location"),
+                }
+                for p in players
+                if (source := p.get("source"))
+            ]
             if not player_list:
                 print("No players found.")
                 return None
 
             # If multiple players, prompt user to select
-            logger.debug(f"Search for '{name}' returned {len(player_list)} results.")
+            logger.debug("Search for '%s' returned %s results.", name, len(player_list))
             if len(player_list) > 1:
                 print("\nMultiple players found. Select one:")
                 for idx, p in enumerate(player_list, 1):
@@ -94,14 +216,14 @@ class UTRAPI:
                 while True:
                     user_input = input("Enter number (0 to cancel): ").strip()
                     if not user_input:
-                        logger.info(f"No selection made, returning first player: {player_list[0]['displayName']} (ID: {player_list[0]['id']})")
+                        logger.info("No selection made, returning first player: %s (ID: %s)", player_list[0]['displayName'], player_list[0]['id'])
                         return player_list[0]
                     try:
                         choice = int(user_input)
                         if choice == 0:
                             return None
                         if 1 <= choice <= len(player_list):
-                            logger.info(f"User selected player: {player_list[choice - 1]['displayName']} (ID: {player_list[choice - 1]['id']})")
+                            logger.info("User selected player: %s (ID: %s)", player_list[choice - 1]['displayName'], player_list[choice - 1]['id'])
                             return player_list[choice - 1]
                     except ValueError:
                         pass
@@ -109,52 +231,82 @@ class UTRAPI:
 
             return player_list[0]
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Search failed for '{name}' at {self.search_url}: {response.status_code if 'response' in locals() else 'No Response'} - {e}")
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+            logger.error("Search failed for '%s' at %s: %s - %s", name, self.SEARCH_URL, response.status_code if 'response' in locals() else 'No Response', e)
             return None
 
     def get_player_profile(self, player_id):
         """Fetch player's profile."""
+        raw_profile = self.get_player_profile_raw(player_id)
+        if raw_profile is None:
+            return None
+        try:
+            return orjson.loads(raw_profile)
+        except orjson.JSONDecodeError as e:
+            logger.error("Failed to decode profile for player ID '%s': %s", player_id, e)
+            return None
+
+    @cached_response("profile")
+    def get_player_profile_raw(self, player_id):
+        """Fetch player's profile as the undecoded JSON body, for callers that only forward it."""
         if not self._ensure_authenticated():
-            logger.error(f"Re-authentication failed. Cannot fetch profile for player ID: {player_id}")
+            logger.error("Re-authentication failed. Cannot fetch profile for player ID: %s", player_id)
             return None
-        profile_url = self.profile_url.format(player_id=player_id)
-        logger.debug(f"Fetching profile for player ID '{player_id}' at: {profile_url}")
+        profile_url = self._profile_url(player_id)
+        logger.debug("Fetching profile for player ID '%s' at: %s", player_id, profile_url)
         try:
-            response = self.session.get(profile_url)
-            response.raise_for_status()
-            return response.json()
+            return self._fetch(profile_url)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to fetch profile for player ID '{player_id}' at {profile_url}: {response.status_code if 'response' in locals() else 'No Response'} - {e}")
-            logger.debug(f"Request details: URL={profile_url}")
+            logger.error("Failed to fetch profile for player ID '%s' at %s: %s - %s", player_id, profile_url, getattr(e.response, 'status_code', 'No Response'), e)
+            logger.debug("Request details: URL=%s", profile_url)
             return None
 
     def get_player_results(self, player_id):
         """Fetch player's match results."""
+        raw_results = self.get_player_results_raw(player_id)
+        if raw_results is None:
+            return None
+        try:
+            return orjson.loads(raw_results)
+        except orjson.JSONDecodeError as e:
+            logger.error("Failed to decode results for player ID '%s': %s", player_id, e)
+            return None
+
+    @cached_response("results")
+    def get_player_results_raw(self, player_id):
+        """Fetch player's match results as the undecoded JSON body, for callers that only forward it."""
         if not self._ensure_authenticated():
-            logger.error(f"Re-authentication failed. Cannot fetch results for player ID: {player_id}")
+            logger.error("Re-authentication failed. Cannot fetch results for player ID: %s", player_id)
             return None
-        results_url = self.results_url.format(player_id=player_id)
+        results_url = self._results_url(player_id)
         try:
-            response = self.session.get(results_url)
-            response.raise_for_status()
-            return response.json()
+            return self._fetch(results_url)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to fetch results for player ID '{player_id}' at {results_url}: {response.status_code if 'response' in locals() else 'No Response'} - {e}")
+            logger.error("Failed to fetch results for player ID '%s' at %s: %s - %s", player_id, results_url, getattr(e.response, 'status_code', 'No Response'), e)
             return None
 
     def get_player_stats(self, player_id, stat="doubles"):
         """Fetch player's stats."""
+        raw_stats = self.get_player_stats_raw(player_id, stat)
+        if raw_stats is None:
+            return None
+        try:
+            return orjson.loads(raw_stats)
+        except orjson.JSONDecodeError as e:
+            logger.error("Failed to decode %s stats for player ID '%s': %s", stat, player_id, e)
+            return None
+
+    @cached_response("stats")
+    def get_player_stats_raw(self, player_id, stat="doubles"):
+        """Fetch player's stats as the undecoded JSON body."""
         if not self._ensure_authenticated():
-            logger.error(f"Re-authentication failed. Cannot fetch {stat} stats for player ID: {player_id}")
+            logger.error("Re-authentication failed. Cannot fetch %s stats for player ID: %s", stat, player_id)
             return None
-        stats_url = self.stats_url.format(player_id=player_id)
+        stats_url = self._stats_url(player_id)
         params={"type": stat, "resultType": "verified", "months": 12, "fetchAllResults": "false"}
-        logger.debug(f"Getting {stat} stats for '{player_id}' at: {self.stats_url} with params: {params}")
+        logger.debug("Getting %s stats for '%s' at: %s with params: %s", stat, player_id, stats_url, params)
         try:
-            response = self.session.get(stats_url, params=params)
-            response.raise_for_status()
-            return response.json()
+            return self._fetch(stats_url, params=params)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to fetch {stat} stats for player ID '{player_id}' at {self.results_url}: {response.status_code if 'response' in locals() else 'No Response'} - {e}")
+            logger.error("Failed to fetch %s stats for player ID '%s' at %s: %s - %s", stat, player_id, stats_url, getattr(e.response, 'status_code', 'No Response'), e)
             return None
@@ -1,15 +1,44 @@
 import logging.config
+import atexit
+import copy
 import os
-import sys
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
 LOGS_DIR = "logs"
 os.makedirs(LOGS_DIR, exist_ok=True)
 
-def configure_logging(debug_mode=False):
-    """Configures logging dynamically using dictConfig with separate log files."""
-    log_level = logging.DEBUG if debug_mode else logging.INFO
+# Background listeners that own the file handlers; kept alive for the life of the process
+_listeners = []
+
+def _stop_listeners():
+    """Drains and stops the background log listeners."""
+    while _listeners:
+        _listeners.pop().stop()
 
-    log_config = {
+atexit.register(_stop_listeners)
+
+def _queue_file_handlers(logger_names):
+    """Swaps each logger's file handlers for queue handlers served by a listener thread."""
+    queue_handlers = {}
+    for name in logger_names:
+        logger = logging.getLogger(name)
+        for handler in list(logger.handlers):
+            if not isinstance(handler, logging.FileHandler):
+                continue
+            if handler not in queue_handlers:
+                # One queue per file so each record still lands only in its logger's file
+                log_queue = queue.SimpleQueue()
+                listener = QueueListener(log_queue, handler, respect_handler_level=True)
+                listener.start()
+                _listeners.append(listener)
+                queue_handlers[handler] = QueueHandler(log_queue)
+            logger.removeHandler(handler)
+            logger.addHandler(queue_handlers[handler])
+
+def _build_log_config(log_level):
+    """Builds the dictConfig schema with separate log files at the given level."""
+    return {
         "version": 1,
         "disable_existing_loggers": False,
         "formatters": {
@@ -25,7 +54,7 @@ def configure_logging(debug_mode=False):
                 "class": "logging.StreamHandler",
                 "level": log_level,
                 "formatter": "simple",
-                "stream": sys.stdout,
+                "stream": "ext://sys.stdout",
             },
             "application_file": {
                 "class": "logging.FileHandler",
@@ -33,6 +62,7 @@ def configure_logging(debug_mode=False):
                 "formatter": "detailed",
                 "filename": "application.log",
                 "mode": "a",
+                "delay": True,
             },
             "api_file": {
                 "class": "logging.FileHandler",
@@ -40,6 +70,7 @@ def configure_logging(debug_mode=False):
                 "formatter": "detailed",
                 "filename": "api.log",
                 "mode": "a",
+                "delay": True,
             },
             "analytics_file": {
                 "class": "logging.FileHandler",
@@ -47,6 +78,7 @@ def configure_logging(debug_mode=False):
                 "formatter": "detailed",
                 "filename": "analytics.log",
                 "mode": "a",
+                "delay": True,
             },
             "data_access_file": {
                 "class": "logging.FileHandler",
@@ -54,6 +86,7 @@ def configure_logging(debug_mode=False):
                 "formatter": "detailed",
                 "filename": "data_access.log",
                 "mode": "a",
+                "delay": True,
             },
             "processing_file": {
                 "class": "logging.FileHandler",
@@ -61,6 +94,7 @@ def configure_logging(debug_mode=False):
                 "formatter": "detailed",
                 "filename": "processing.log",
                 "mode": "a",
+                "delay": True,
             },
         },
         "loggers": {
@@ -96,7 +130,27 @@ def configure_logging(debug_mode=False):
         },
     }
 
-    logging.config.dictConfig(log_config)
+
+# Both variants are built once at import; configure_logging only picks one
+_LOG_CONFIG_INFO = _build_log_config(logging.INFO)
+_LOG_CONFIG_DEBUG = _build_log_config(logging.DEBUG)
+
+# The debug_mode the process is currently configured for, or None before the first call
+_configured_mode = None
+
+def configure_logging(debug_mode=False):
+    """Configures logging dynamically using dictConfig with separate log files."""
+    global _configured_mode
+    if _configured_mode == debug_mode:
+        return
+    log_config = _LOG_CONFIG_DEBUG if debug_mode else _LOG_CONFIG_INFO
+
+    _stop_listeners()
+    # dictConfig consumes the dict it is given, so hand it a copy of the template
+    logging.config.dictConfig(copy.deepcopy(log_config))
+    # Console output stays synchronous so it interleaves correctly with print()
+    _queue_file_handlers([None, *log_config["loggers"]])
+    _configured_mode = debug_mode
 
 # if __name__ == "__main__":
     # configure_logging()
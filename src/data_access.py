@@ -1,5 +1,5 @@
 import pandas as pd
-import json
+import orjson
 import os
 import logging
 
@@ -9,11 +9,11 @@ RAW_DIR = "data/raw"
 # Get a logger instance for this module
 logger = logging.getLogger(__name__)
 
-def load_player_results(player_id):
-    """Loads player results from a Parquet file."""
+def load_player_results(player_id, columns=None):
+    """Loads player results from a Parquet file, optionally reading only the given columns."""
     try:
         results_path = os.path.join(DATA_DIR, f"player_{player_id}_results.parquet")
-        return pd.read_parquet(results_path)
+        return pd.read_parquet(results_path, columns=columns, engine="pyarrow")
     except FileNotFoundError:
         logger.error(f"Player results file not found for player {player_id}")
         return None
@@ -26,8 +26,8 @@ def load_player_stats(player_id, match_type):
     try:
         stats_file = f"player_{player_id}_{match_type}_stats.json"
         stats_path = os.path.join(RAW_DIR, stats_file)
-        with open(stats_path, "r") as f:
-            return json.load(f)
+        with open(stats_path, "rb") as f:
+            return orjson.loads(f.read())
     except FileNotFoundError:
         logger.error(f"Player stats file not found for player {player_id} and match type {match_type}")
         return None
@@ -35,11 +35,11 @@ def load_player_stats(player_id, match_type):
         logger.error(f"Error loading player stats: {e}")
         return None
 
-def load_player_profile(player_id):
-    """Loads player profile from a parquet file."""
+def load_player_profile(player_id, columns=None):
+    """Loads player profile from a parquet file, optionally reading only the given columns."""
     try:
         profile_path = os.path.join(DATA_DIR, f"player_{player_id}_profile.parquet")
-        return pd.read_parquet(profile_path)
+        return pd.read_parquet(profile_path, columns=columns, engine="pyarrow")
     except FileNotFoundError:
         logger.error(f"Player profile file not found for player {player_id}")
         return None
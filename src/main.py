@@ -1,10 +1,19 @@
 import argparse
+import gzip
 import logging.config
 import logging
 import os
 import sys
 from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project root to the Python path so shared modules resolve under their src. name
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
 from api.utr_api import UTRAPI
 from processing.data_saver import save_player_profile, save_player_results, save_player_stats
 from analytics.utr_service import get_player_utr_scores
@@ -12,11 +21,97 @@ from config import configure_logging
 
 # Define the base URL for your backend API
 API_BASE_URL = "http://tennis.lynuxss.com:8080/api"
+JSON_HEADERS = {"Content-Type": "application/json"}
+# Opt-in: set BACKEND_GZIP=1 only if the backend accepts Content-Encoding: gzip request bodies
+GZIP_REQUESTS = os.getenv("BACKEND_GZIP", "0").lower() in ("1", "true", "yes")
+# With GZIP_REQUESTS on, bodies above this many bytes are gzip-compressed before POSTing
+GZIP_THRESHOLD = 4096
+
+# One pooled keep-alive session for every backend POST
+BACKEND_SESSION = requests.Session()
+# POSTs are not idempotent, so urllib3 only retries them when the connection could not be made
+BACKEND_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(
+    total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])))
+
+def post_json(url, body):
+    """POSTs an encoded JSON body to the backend, gzip-compressing large ones when GZIP_REQUESTS is on."""
+    headers = JSON_HEADERS
+    if GZIP_REQUESTS and len(body) > GZIP_THRESHOLD:
+        # Level 1 is the fastest setting and still shrinks JSON several times over
+        body = gzip.compress(body, compresslevel=1)
+        headers = {**JSON_HEADERS, "Content-Encoding": "gzip"}
+    return BACKEND_SESSION.post(url, data=body, headers=headers)
+
+def process_player(api, player):
+    """Fetches a found player's profile and results and sends both to the backend API."""
+    logger = logging.getLogger("application")
+    processing_logger = logging.getLogger("processing")
+
+    player_id = player['id']
+    player_display_name = player['displayName']
+    logger.info("Found player: '%s' (ID: %s).", player_display_name, player_id)
+    # Output is collected and written in one go so concurrent batch workers don't interleave
+    output = []
+
+    # Fetch profile and results concurrently; both are independent HTTPS round-trips
+    logger.info("Fetching profile and results for %s (ID: %s).", player_display_name, player_id)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # Both payloads are only forwarded, so keep the raw bodies instead of decoding and re-encoding
+        profile_future = executor.submit(api.get_player_profile_raw, player_id)
+        results_future = executor.submit(api.get_player_results_raw, player_id)
+
+    # Send player profile to API
+    output.append(f"\nFetching profile for {player_display_name}...")
+    profile = profile_future.result()
+    if profile:
+        try:
+            processing_logger.info("Sending profile for %s to backend API.", player_display_name)
+            response = post_json(f"{API_BASE_URL}/players", profile)
+            response.raise_for_status()  # This will raise an exception for HTTP errors
+            output.append(f"Profile for {player_display_name} sent to application successfully!")
+            logger.info("Profile for %s sent successfully.", player_display_name)
+        except requests.exceptions.RequestException as e:
+            output.append(f"Error sending profile to API: {e}")
+            logger.error("API Error sending profile for %s: %s", player_display_name, e)
+    else:
+        logger.warning("Failed to retrieve profile for %s (ID: %s).", player_display_name, player_id)
+
+
+    # Send player match results to API
+    output.append(f"\nFetching results for {player_display_name}...")
+    results = results_future.result()
+    if results:
+        try:
+            processing_logger.info("Sending results for %s to backend API.", player_display_name)
+            response = post_json(f"{API_BASE_URL}/matches/import", results)
+            response.raise_for_status()
+            import_summary = orjson.loads(response.content)
+            output.append(f"Match results for {player_display_name} sent to application successfully!")
+            output.append(f"Summary: {import_summary.get('imported', 0)} imported, {import_summary.get('skipped', 0)} skipped.")
+            logger.info("Results for %s sent successfully: %s", player_display_name, import_summary)
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+            output.append(f"Error sending results to API: {e}")
+            logger.error("API Error sending results for %s: %s", player_display_name, e)
+    else:
+        logger.warning("Failed to retrieve match results for %s (ID: %s).", player_display_name, player_id)
+
+    output.append("-" * 40)
+    sys.stdout.write("\n".join(output) + "\n")
+
+def read_player_names(player_arg, players_file):
+    """Collects player names from a comma-separated --player value and a one-name-per-line file."""
+    names = [name.strip() for name in player_arg.split(",")] if player_arg else []
+    if players_file:
+        with open(players_file, "r") as f:
+            names.extend(line.strip() for line in f)
+    return [name for name in names if name]
 
 def main(debug_mode=False):
     parser = argparse.ArgumentParser(description="UTR Player Lookup and Importer CLI")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
-    parser.add_argument("--player", "-p", help="Player name to search")
+    parser.add_argument("--player", "-p", help="Player name to search (comma-separate several names)")
+    parser.add_argument("--players-file", help="File with one player name per line to import in a batch")
+    parser.add_argument("--concurrency", type=int, default=4, help="Players processed in parallel in batch mode")
     args = parser.parse_args()
 
     configure_logging(debug_mode)
@@ -26,8 +121,6 @@ def main(debug_mode=False):
 
     api = UTRAPI()
     api_logger = logging.getLogger("api")
-    analytics_logger = logging.getLogger("analytics")
-    processing_logger = logging.getLogger("processing")
 
     # Login
     api_logger.info("Attempting to log in to UTR API.")
@@ -36,69 +129,51 @@ def main(debug_mode=False):
         print("Failed to log in. Exiting.")
         return
 
+    player_names = read_player_names(args.player, args.players_file)
+    if player_names:
+        logger.info("Searching for %s players from command line arguments.", len(player_names))
+
+        def search_and_process(player_name):
+            # Batch mode takes the top hit (limit=1), so no selection prompt can block a worker
+            api_logger.info("Searching for player: '%s'.", player_name)
+            try:
+                player = api.search_player(player_name, limit=1)
+                if not player:
+                    logger.info("No player found for search term: '%s'.", player_name)
+                    print(f"No player found for '{player_name}'.")
+                    return False
+                process_player(api, player)
+                return True
+            except Exception as e:
+                # One failing player must not abandon the rest of the batch
+                logger.exception("Error processing player '%s': %s", player_name, e)
+                print(f"Error processing '{player_name}': {e}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+            processed = sum(executor.map(search_and_process, player_names))
+        logger.info("Batch finished: %s of %s players processed.", processed, len(player_names))
+        # Batch runs are non-interactive (cron, redirected stdin), so never fall through to the prompt
+        logger.info("Application finished.")
+        return
+
     while True:
-        if args.player:
-            player_name = args.player
-            logger.info(f"Searching for player from command line argument: '{player_name}'.")
-            args.player = None
-        else:
-            player_name = input("\nEnter player name to search (or 'q' to quit): ").strip()
-            logger.info(f"User input: '{player_name}'.")
+        player_name = input("\nEnter player name to search (or 'q' to quit): ").strip()
+        logger.info("User input: '%s'.", player_name)
 
         if player_name.lower() == 'q':
             logger.info("User requested to quit the application.")
             break
 
         # Search for player
-        api_logger.info(f"Searching for player: '{player_name}'.")
+        api_logger.info("Searching for player: '%s'.", player_name)
         player = api.search_player(player_name)
         if not player:
-            logger.info(f"No player found for search term: '{player_name}'.")
+            logger.info("No player found for search term: '%s'.", player_name)
             print("No player selected. Try again.")
             continue
 
-        player_id = player['id']
-        player_display_name = player['displayName']
-        logger.info(f"Found player: '{player_display_name}' (ID: {player_id}).")
-
-        # Fetch player profile and send to API
-        logger.info(f"Fetching profile for {player_display_name} (ID: {player_id}).")
-        print(f"\nFetching profile for {player['displayName']}...")
-        profile = api.get_player_profile(player['id'])
-        if profile:
-            try:
-                processing_logger.info(f"Sending profile for {player_display_name} to backend API.")
-                response = requests.post(f"{API_BASE_URL}/players", json=profile)
-                response.raise_for_status()  # This will raise an exception for HTTP errors
-                print(f"Profile for {player['displayName']} sent to application successfully!")
-                logger.info(f"Profile for {player_display_name} sent successfully.")
-            except requests.exceptions.RequestException as e:
-                print(f"Error sending profile to API: {e}")
-                logger.error(f"API Error sending profile for {player_display_name}: {e}")
-        else:
-            logger.warning(f"Failed to retrieve profile for {player_display_name} (ID: {player_id}).")
-
-
-        # Fetch player match results and send to API
-        logger.info(f"Fetching results for {player_display_name} (ID: {player_id}).")
-        print(f"\nFetching results for {player['displayName']}...")
-        results = api.get_player_results(player['id'])
-        if results:
-            try:
-                processing_logger.info(f"Sending results for {player_display_name} to backend API.")
-                response = requests.post(f"{API_BASE_URL}/matches/import", json=results)
-                response.raise_for_status()
-                import_summary = response.json()
-                print(f"Match results for {player['displayName']} sent to application successfully!")
-                print(f"Summary: {import_summary.get('imported', 0)} imported, {import_summary.get('skipped', 0)} skipped.")
-                logger.info(f"Results for {player_display_name} sent successfully: {import_summary}")
-            except requests.exceptions.RequestException as e:
-                print(f"Error sending results to API: {e}")
-                logger.error(f"API Error sending results for {player_display_name}: {e}")
-        else:
-            logger.warning(f"Failed to retrieve match results for {player_display_name} (ID: {player_id}).")
-
-        print("-" * 40)
+        process_player(api, player)
     logger.info("Application finished.")
 
 
@@ -1,200 +1,275 @@
 import sqlite3
 import os
 import pandas as pd
-import json
 import logging
+import orjson
+import ijson
+from collections import namedtuple
+from itertools import islice
+from src.processing.connections import connect, get_conn, close_connections
 
 logger = logging.getLogger(__name__)
 
 DB_DIR = "data/db"
 PLAYERS_DB_FILE = os.path.join(DB_DIR, "players.db")
+IN_QUERY_CHUNK_SIZE = 900
+MATCH_INSERT_BATCH_SIZE = 1000
+
+CREATE_MATCHES_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS matches (
+        match_id TEXT PRIMARY KEY,
+        match_date TEXT,
+        match_format TEXT,
+        score TEXT,
+        result TEXT,
+        player1_id TEXT,
+        player2_id TEXT,
+        opponent1_id TEXT,
+        opponent2_id TEXT,
+        FOREIGN KEY (player1_id) REFERENCES players(id),
+        FOREIGN KEY (player2_id) REFERENCES players(id),
+        FOREIGN KEY (opponent1_id) REFERENCES players(id),
+        FOREIGN KEY (opponent2_id) REFERENCES players(id)
+    )
+"""
+
+MatchRow = namedtuple(
+    "MatchRow",
+    "match_id match_date match_format score result player1_id player2_id opponent1_id opponent2_id"
+)
+
+INSERT_MATCH_SQL = """
+    INSERT OR IGNORE INTO matches (
+        match_id, match_date, match_format, score, result,
+        player1_id, player2_id, opponent1_id, opponent2_id
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Unconstrained staging copy of matches used by bulk_load_matches
+CREATE_MATCHES_STAGING_SQL = "CREATE TEMP TABLE matches_staging AS SELECT * FROM matches WHERE 0"
+
+STAGE_MATCH_SQL = "INSERT INTO matches_staging VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+MERGE_STAGED_MATCHES_SQL = "INSERT OR IGNORE INTO matches SELECT * FROM matches_staging ORDER BY match_id, rowid"
+
+# json_each and the ->> operator need SQLite 3.38+
+JSON_EACH_SUPPORTED = sqlite3.sqlite_version_info >= (3, 38, 0)
+
+INSERT_MATCHES_JSON_SQL = """
+    INSERT OR IGNORE INTO matches (
+        match_id, match_date, match_format, score, result,
+        player1_id, player2_id, opponent1_id, opponent2_id
+    )
+    SELECT value->>0, value->>1, value->>2, value->>3, value->>4,
+           value->>5, value->>6, value->>7, value->>8
+    FROM json_each(?)
+"""
+
+def _connect() -> sqlite3.Connection:
+    """Opens an uncached connection to the players database for a bulk ingestion run."""
+    return connect(PLAYERS_DB_FILE)
+
+def _get_conn() -> sqlite3.Connection:
+    """Returns this thread's cached connection to the players database."""
+    return get_conn(PLAYERS_DB_FILE)
 
 def load_player_profile_from_db(player_id: str) -> dict | None:
     """Loads a player's profile from the database by their ID."""
-    conn = sqlite3.connect(PLAYERS_DB_FILE)
-    cursor = conn.cursor()
+    cursor = _get_conn().cursor()
     cursor.execute("SELECT * FROM players WHERE id=?", (player_id,))
     row = cursor.fetchone()
-    conn.close()
 
-    if row:
-        # Assuming the order of columns in the SELECT matches the table definition
-        profile = {
-            "id": row[0],
-            "firstName": row[1],
-            "lastName": row[2],
-            "gender": row[3],
-            "birthDate": row[4],
-            "ageRange": row[5],
-            "displayName": row[6],
-            "myUtrSingles": row[7],
-            "myUtrDoubles": row[8],
-            "descriptionShort": row[9]
-        }
-        return profile
-    return None
+    return dict(row) if row else None
 
 def load_multiple_player_profiles_from_db(player_ids: list[str]) -> dict[str, dict]:
     """Loads multiple player profiles from the database by their IDs."""
     profiles = {}
-    for player_id in player_ids:
-        profile = load_player_profile_from_db(player_id)
-        if profile:
-            profiles[player_id] = profile
+    if not player_ids:
+        return profiles
+    cursor = _get_conn().cursor()
+    # Stay well under SQLite's default limit of 999 bound parameters
+    for i in range(0, len(player_ids), IN_QUERY_CHUNK_SIZE):
+        chunk = player_ids[i:i + IN_QUERY_CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        cursor.execute(f"SELECT * FROM players WHERE id IN ({placeholders})", chunk)
+        profiles.update({row["id"]: dict(row) for row in cursor.fetchall()})
     return profiles
 
 def _create_matches_table():
-    conn = sqlite3.connect(PLAYERS_DB_FILE)
+    conn = _connect()
     cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS matches (
-            match_id TEXT PRIMARY KEY,
-            match_date TEXT,
-            match_format TEXT,
-            score TEXT,
-            result TEXT,
-            player1_id TEXT,
-            player2_id TEXT,
-            opponent1_id TEXT,
-            opponent2_id TEXT,
-            FOREIGN KEY (player1_id) REFERENCES players(id),
-            FOREIGN KEY (player2_id) REFERENCES players(id),
-            FOREIGN KEY (opponent1_id) REFERENCES players(id),
-            FOREIGN KEY (opponent2_id) REFERENCES players(id)
-        )
-    """)
+    cursor.execute(CREATE_MATCHES_TABLE_SQL)
     conn.commit()
     conn.close()
     logger.info("Matches table created or already exists.")
 
-def _insert_match(conn: sqlite3.Connection, match_data: dict):
+def _insert_matches(cursor: sqlite3.Cursor, rows: list[MatchRow]):
+    """Inserts match rows, letting SQLite expand a single JSON array when it can."""
+    if JSON_EACH_SUPPORTED:
+        payload = orjson.dumps([tuple(row) for row in rows]).decode()
+        cursor.execute(INSERT_MATCHES_JSON_SQL, (payload,))
+    else:
+        cursor.executemany(INSERT_MATCH_SQL, rows)
+
+def _stream_draws(f):
+    """Streams draw objects from an open results JSON file without loading the whole document."""
+    return ijson.items(f, "events.item.draws.item", use_float=True)
+
+def _iter_match_rows(player_id: str, draws):
+    """Yields a MatchRow for every result in the given draws that involves the player."""
+    for draw in draws:
+        match_format = "Singles" if draw.get('teamType') != "DOUBLES" else "Doubles"
+        for result in draw.get('results', []):
+            winner = result.get('winner')
+            loser = result.get('loser')
+            players = result.get('players')
+            match_id = result.get('id')
+            match_date_str = result.get('date')
+            match_date = match_date_str.split('T')[0] if match_date_str else None
+            match_result = None
+            player1_id = None
+            player2_id = None
+            opponent1_id = None
+            opponent2_id = None
+
+            if not players or not winner or not loser or not match_id:
+                continue
+
+            # Extract score, ordering sets numerically so "10" sorts after "9"
+            score_data = result.get('score', {})
+            score_parts = [
+                f"{score_data[set_num].get('winner', 0)}-{score_data[set_num].get('loser', 0)}"
+                for set_num in sorted(score_data, key=int)
+            ]
+
+            if match_format == "Singles":
+                winner1_id = players.get('winner1', {}).get('id')
+                loser1_id = players.get('loser1', {}).get('id')
+
+                if winner1_id == player_id:
+                    player1_id = player_id
+                    opponent1_id = loser1_id
+                    match_result = "Win"
+                elif loser1_id == player_id:
+                    player1_id = player_id
+                    opponent1_id = winner1_id
+                    match_result = "Loss"
+
+            elif match_format == "Doubles":
+                winner_team_ids = {players.get('winner1', {}).get('id'), players.get('winner2', {}).get('id')}
+                loser_team_ids = {players.get('loser1', {}).get('id'), players.get('loser2', {}).get('id')}
+
+                if player_id in winner_team_ids:
+                    match_result = "Win"
+                    team, other_team = winner_team_ids, loser_team_ids
+                elif player_id in loser_team_ids:
+                    match_result = "Loss"
+                    team, other_team = loser_team_ids, winner_team_ids
+
+                if match_result:
+                    player1_id = player_id
+                    # Partner is whoever else is on the player's team; opponents are the other team
+                    player2_id = next(iter(team - {player_id, None}), None)
+                    opponents = iter(other_team - {None})
+                    opponent1_id = next(opponents, None)
+                    opponent2_id = next(opponents, None)
+
+            if player1_id and match_result:
+                yield MatchRow(
+                    str(match_id),
+                    match_date,
+                    match_format,
+                    ", ".join(score_parts),
+                    match_result,
+                    player1_id,
+                    player2_id,
+                    opponent1_id,
+                    opponent2_id
+                )
+
+def read_player_match_rows(player_id: str, file_path: str) -> list[MatchRow]:
+    """Parses a player's results JSON file into match rows without touching the database.
+
+    Errors propagate to the caller, so this can run in a worker process.
+    """
+    with open(file_path, 'rb') as f:
+        return list(_iter_match_rows(player_id, _stream_draws(f)))
+
+def insert_player_matches(player_id: str, rows):
+    """Inserts a player's match rows into the database in a single transaction.
+
+    Rows may be a lazy iterable; they are written in batches of MATCH_INSERT_BATCH_SIZE.
+    Errors raised while producing rows roll back the transaction and propagate.
+    """
+    conn = _connect()
+    cursor = conn.cursor()
+    rows = iter(rows)
+    inserted = 0
+    try:
+        cursor.execute(CREATE_MATCHES_TABLE_SQL)
+        conn.execute("BEGIN")
+        while batch := list(islice(rows, MATCH_INSERT_BATCH_SIZE)):
+            _insert_matches(cursor, batch)
+            inserted += len(batch)
+        conn.commit()
+        logger.info(f"Inserted {inserted} matches for player '{player_id}'.")
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.error(f"Error inserting matches for player '{player_id}': {e}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def bulk_load_matches(player_rows) -> int:
+    """Loads many players' match rows at once through an unindexed staging table.
+
+    player_rows yields (player_id, rows) pairs. Rows are appended to a TEMP table with no
+    primary key, then merged into matches in match_id order so its index is built in one
+    sorted pass. Returns the number of matches added.
+    """
+    conn = _connect()
     cursor = conn.cursor()
     try:
-        cursor.execute("""
-            INSERT OR IGNORE INTO matches (
-                match_id, match_date, match_format, score, result,
-                player1_id, player2_id, opponent1_id, opponent2_id
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            match_data.get('match_id'),
-            match_data.get('match_date'),
-            match_data.get('match_format'),
-            match_data.get('score'),
-            match_data.get('result'),
-            match_data.get('player1_id'),
-            match_data.get('player2_id'),
-            match_data.get('opponent1_id'),
-            match_data.get('opponent2_id')
-        ))
+        cursor.execute(CREATE_MATCHES_TABLE_SQL)
+        cursor.execute(CREATE_MATCHES_STAGING_SQL)
+        conn.execute("BEGIN")
+        for player_id, rows in player_rows:
+            rows = iter(rows)
+            staged = 0
+            while batch := list(islice(rows, MATCH_INSERT_BATCH_SIZE)):
+                cursor.executemany(STAGE_MATCH_SQL, batch)
+                staged += len(batch)
+            logger.debug(f"Staged {staged} matches for player '{player_id}'.")
+        cursor.execute(MERGE_STAGED_MATCHES_SQL)
+        inserted = cursor.rowcount
         conn.commit()
+        logger.info(f"Bulk loaded {inserted} new matches.")
+        return inserted
     except sqlite3.Error as e:
-        logger.error(f"Error inserting match {match_data.get('match_id')}: {e}")
+        conn.rollback()
+        logger.error(f"Error bulk loading matches: {e}")
+        return 0
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
 
 def load_player_match_stats(player_id: str, file_path: str):
     """Loads a player's match statistics from a JSON file into the database."""
     _create_matches_table()
     if file_path.endswith(".json"):
-        conn = sqlite3.connect(PLAYERS_DB_FILE)
-        cursor = conn.cursor()
         try:
-            with open(file_path, 'r') as f:
-                player_results = json.load(f)
-            logger.info(f"Loaded match stats for player '{player_id}' from JSON file: {file_path}")
-
-            for event in player_results.get('events', []):
-                for draw in event.get('draws', []):
-                    match_format = "Singles" if draw.get('teamType') != "DOUBLES" else "Doubles"
-                    for result in draw.get('results', []):
-                        winner = result.get('winner')
-                        loser = result.get('loser')
-                        players = result.get('players')
-                        match_id = result.get('id')
-                        match_date_str = result.get('date')
-                        match_date = match_date_str.split('T')[0] if match_date_str else None
-                        score_parts = []
-                        match_result = None
-                        player1_id = None
-                        player2_id = None
-                        opponent1_id = None
-                        opponent2_id = None
-
-                        if not players or not winner or not loser or not match_id:
-                            continue
-
-                        # Extract score
-                        score_data = result.get('score', {})
-                        for set_num in sorted(score_data.keys()):
-                            set_score = score_data[set_num]
-                            score_parts.append(f"{set_score.get('winner', 0)}-{set_score.get('loser', 0)}")
-
-                        if match_format == "Singles":
-                            winner1_id = players.get('winner1', {}).get('id')
-                            loser1_id = players.get('loser1', {}).get('id')
-
-                            if winner1_id == player_id:
-                                player1_id = player_id
-                                opponent1_id = loser1_id
-                                match_result = "Win"
-                            elif loser1_id == player_id:
-                                player1_id = player_id
-                                opponent1_id = winner1_id
-                                match_result = "Loss"
-
-                        elif match_format == "Doubles":
-                            winner_team_ids = {players.get('winner1', {}).get('id'), players.get('winner2', {}).get('id')}
-                            loser_team_ids = {players.get('loser1', {}).get('id'), players.get('loser2', {}).get('id')}
-
-                            if player_id in winner_team_ids:
-                                match_result = "Win"
-                                player1_id = player_id
-                                # Try to identify partner and opponents
-                                for win_player_id in winner_team_ids:
-                                    if win_player_id != player_id:
-                                        player2_id = win_player_id
-                                        break
-                                for lose_player_id in loser_team_ids:
-                                    if opponent1_id is None:
-                                        opponent1_id = lose_player_id
-                                    elif opponent1_id != lose_player_id:
-                                        opponent2_id = lose_player_id
-                                        break
-                            elif player_id in loser_team_ids:
-                                match_result = "Loss"
-                                player1_id = player_id
-                                # Try to identify partner and opponents
-                                for lose_player_id in loser_team_ids:
-                                    if lose_player_id != player_id:
-                                        player2_id = lose_player_id
-                                        break
-                                for win_player_id in winner_team_ids:
-                                    if opponent1_id is None:
-                                        opponent1_id = win_player_id
-                                    elif opponent1_id != win_player_id:
-                                        opponent2_id = win_player_id
-                                        break
-
-                        if player1_id and match_result:
-                            match_data = {
-                                'match_id': str(match_id),
-                                'match_date': match_date,
-                                'match_format': match_format,
-                                'score': ", ".join(score_parts),
-                                'result': match_result,
-                                'player1_id': player1_id,
-                                'player2_id': player2_id,
-                                'opponent1_id': opponent1_id,
-                                'opponent2_id': opponent2_id
-                            }
-                            _insert_match(conn, match_data)
-
+            with open(file_path, 'rb') as f:
+                insert_player_matches(player_id, _iter_match_rows(player_id, _stream_draws(f)))
         except FileNotFoundError:
             logger.error(f"Match stats JSON file not found: {file_path}")
-        except json.JSONDecodeError as e:
+        except ijson.JSONError as e:
             logger.error(f"Error decoding JSON file {file_path}: {e}")
         except Exception as e:
             logger.error(f"Error loading match stats from JSON file {file_path}: {e}")
-        finally:
-            conn.close()
     elif file_path.endswith(".parquet"):
         logger.warning("Loading match stats from Parquet files is not yet implemented.")
     else:
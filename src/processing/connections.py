@@ -0,0 +1,49 @@
+import sqlite3
+import atexit
+import threading
+
+_tls = threading.local()
+_all_conns = []
+_all_conns_lock = threading.Lock()
+# Bumped by close_connections so other threads drop their closed cached connections
+_generation = 0
+
+def connect(db_file: str, foreign_keys: bool = False) -> sqlite3.Connection:
+    """Opens a connection to db_file tuned for write-heavy use, with rows keyed by column name."""
+    # check_same_thread is off only so the atexit hook can close it; each thread uses its own
+    conn = sqlite3.connect(db_file, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA cache_size=-64000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    if foreign_keys:
+        conn.execute("PRAGMA foreign_keys=ON")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def get_conn(db_file: str, foreign_keys: bool = False) -> sqlite3.Connection:
+    """Returns this thread's cached connection to db_file, opening it on first use.
+
+    Connections with and without foreign key enforcement are cached separately. The
+    directory holding db_file must already exist.
+    """
+    if getattr(_tls, "generation", None) != _generation:
+        _tls.conns = {}
+        _tls.generation = _generation
+    key = (db_file, foreign_keys)
+    conn = _tls.conns.get(key)
+    if conn is None:
+        conn = _tls.conns[key] = connect(db_file, foreign_keys)
+        with _all_conns_lock:
+            _all_conns.append(conn)
+    return conn
+
+@atexit.register
+def close_connections():
+    """Closes every cached connection, whichever thread opened it."""
+    global _generation
+    with _all_conns_lock:
+        while _all_conns:
+            _all_conns.pop().close()
+        _generation += 1
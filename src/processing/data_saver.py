@@ -1,39 +1,158 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import os
-import json
+import hashlib
 import logging
+import orjson
+import ijson
 import sqlite3
+import threading
+from itertools import islice
+from src.processing.connections import get_conn, close_connections
 
 DATA_DIR = "data/processed"
 RAW_DIR = "data/raw"
 DB_DIR = "data/db"
 PLAYERS_DB_FILE = os.path.join(DB_DIR, "players.db")
+COMBINED_RESULTS_FILE = os.path.join(DATA_DIR, "results.parquet")
+
+# Columns of the players table, in insert order; they double as the profile keys
+PLAYER_COLUMNS = (
+    "id", "firstName", "lastName", "gender", "birthDate",
+    "ageRange", "displayName", "myUtrSingles", "myUtrDoubles", "descriptionShort",
+)
+
+INSERT_PLAYER_SQL = f"""
+    INSERT OR REPLACE INTO players ({", ".join(PLAYER_COLUMNS)})
+    VALUES ({", ".join("?" * len(PLAYER_COLUMNS))})
+"""
+
+# Mostly small string columns: ZSTD with dictionary encoding beats the Snappy default on size
+PARQUET_OPTIONS = {
+    "compression": "zstd",
+    "compression_level": 3,
+    "use_dictionary": True,
+    "row_group_size": 64_000,
+}
+
+# Low-cardinality strings become categories and small ints/flags use nullable compact dtypes
+RESULTS_DTYPES = {
+    "teamType": "category",
+    "sportTypeId": "Int16",
+    "sourceType": "category",
+    "completionType": "category",
+    "outcome": "category",
+    "finalized": "boolean",
+}
+
+# Rows per RecordBatch when converting results for the combined results file
+RESULTS_BATCH_SIZE = 4096
+
+# Fixed schema for the combined results file; players/score are JSON strings as in the per-player files
+RESULTS_SCHEMA = pa.schema([
+    ("player_id", pa.string()),
+    ("event_id", pa.int64()),
+    ("event_name", pa.string()),
+    ("draw_id", pa.string()),
+    ("draw_name", pa.string()),
+    ("result_id", pa.int64()),
+    ("date", pa.string()),
+    ("players", pa.string()),
+    ("score", pa.string()),
+    ("teamType", pa.string()),
+    ("sportTypeId", pa.int64()),
+    ("sourceType", pa.string()),
+    ("completionType", pa.string()),
+    ("outcome", pa.string()),
+    ("finalized", pa.bool_()),
+])
 
 # Get a logger instance for this module
 logger = logging.getLogger(__name__)
 
-def _save_parquet(df, file_path):
-    """Helper function to save DataFrame to Parquet with error handling."""
-    logger.debug(f"Saving DataFrame with {len(df)} rows to {file_path}")
+_created_dirs: set[str] = set()
+_created_dirs_lock = threading.Lock()
+
+def ensure_dir(path):
+    """Creates a directory the first time it's needed, so repeated saves skip the makedirs call."""
+    if not path or path in _created_dirs:
+        return
+    with _created_dirs_lock:
+        if path not in _created_dirs:
+            os.makedirs(path, exist_ok=True)
+            _created_dirs.add(path)
+
+def _save_parquet(data, file_path):
+    """Helper function to save a DataFrame or pyarrow Table to Parquet with error handling."""
+    logger.debug(f"Saving DataFrame with {len(data)} rows to {file_path}")
     try:
-        df.to_parquet(file_path, engine="pyarrow", index=False)
+        ensure_dir(os.path.dirname(file_path))
+        if isinstance(data, pa.Table):
+            pq.write_table(data, file_path, **PARQUET_OPTIONS)
+        else:
+            data.to_parquet(file_path, engine="pyarrow", index=False, **PARQUET_OPTIONS)
         logger.debug(f"Successfully saved DataFrame to {file_path}")
     except Exception as e:
         logger.error(f"Error saving DataFrame to {file_path}: {e}")
 
-def _save_json(contents, file_path):
-    """Helper function to save text to json with error handling."""
+def _encode_nested(record):
+    """Returns a copy of record with its dict and list values encoded as JSON text."""
+    dumps = orjson.dumps
+    return {key: dumps(value).decode() if isinstance(value, (dict, list)) else value for key, value in record.items()}
+
+def _records_to_table(records):
+    """Builds a pyarrow Table with one column per top-level key and nested values as JSON text."""
+    return pa.Table.from_pylist([_encode_nested(record) for record in records])
+
+def _save_parquet_pylist(records, file_path):
+    """Save records to Parquet straight through pyarrow, skipping the pandas layer.
+
+    Nested values are always stored as JSON strings, so a file's layout doesn't depend on
+    whether its nested values would fit a Parquet struct.
+    """
+    _save_parquet(_records_to_table(records), file_path)
+
+def _content_hash(contents):
+    """Returns a stable digest of JSON-serializable contents."""
+    return hashlib.blake2b(orjson.dumps(contents, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+
+def _stored_hash(file_path):
+    """Returns the content hash recorded in the sidecar next to a saved JSON file, if any."""
+    try:
+        with open(f"{file_path}.hash", "r") as hash_file:
+            return hash_file.read().strip()
+    except OSError:
+        return None
+
+def _store_hash(file_path, digest):
+    """Records the content hash of a saved JSON file in its sidecar."""
+    with open(f"{file_path}.hash", "w") as hash_file:
+        hash_file.write(digest)
+
+def _save_json(contents, file_path, pretty=False):
+    """Helper function to save text to json with error handling, skipping unchanged contents.
+
+    Raw copies are written compact by default; pass pretty=True for two-space indentation.
+    """
     logger.debug(f"Saving JSON data to {file_path}")
     try:
-        with open(file_path, "w") as json_file:
-            json.dump(contents, json_file, indent=2)
+        digest = _content_hash(contents)
+        if digest == _stored_hash(file_path) and os.path.exists(file_path):
+            logger.debug(f"Raw json at {file_path} is unchanged, skipping write")
+            return
+        ensure_dir(os.path.dirname(file_path))
+        with open(file_path, "wb") as json_file:
+            json_file.write(orjson.dumps(contents, option=orjson.OPT_INDENT_2 if pretty else 0))
+        _store_hash(file_path, digest)
         logger.debug(f"Successfully saved raw json to {file_path}")
     except Exception as e:
         logger.error(f"Error saving raw json to {file_path}: {e}")
 
 def _create_players_table(db_file: str):
     """Creates the players table in the database if it doesn't exist."""
-    conn = sqlite3.connect(db_file)
+    ensure_dir(os.path.dirname(db_file))
+    conn = get_conn(db_file)
     cursor = conn.cursor()
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS players (
@@ -50,84 +169,87 @@ def _create_players_table(db_file: str):
         )
     """)
     conn.commit()
-    conn.close()
+
+def _profile_row(profile):
+    """Builds the players table row for a profile dict."""
+    return tuple(map(profile.get, PLAYER_COLUMNS))
 
 def save_player_profile(profile, player_id):
     """Save player profile to parquet file."""
     logger.info(f"Saving profile for player ID: {player_id}.")
     try:
-        df = pd.json_normalize(profile)
-        os.makedirs(DATA_DIR, exist_ok=True)
         file_path = os.path.join(DATA_DIR, f"player_{player_id}_profile.parquet")
-        logger.info(f"Saving {player_id} profile to Parquet file.")
-        _save_parquet(df, file_path)
+        logger.debug("Saving %s profile to Parquet file.", player_id)
+        _save_parquet_pylist([profile], file_path)
     except Exception as e:
         logger.error(f"Error saving parquet profile for player {player_id}: {e}")
 
     """Save player profile to json file."""
     try:
-        os.makedirs(RAW_DIR, exist_ok=True)
         file_path = os.path.join(RAW_DIR, f"player_{player_id}_profile.json")
-        logger.info(f"Saving {player_id} profile to json file.")
+        logger.debug("Saving %s profile to json file.", player_id)
         _save_json(profile, file_path)
     except Exception as e:
         logger.error(f"Error saving json profile for player {player_id}: {e}")
 
     """Save player profile to SQLite database."""
-    os.makedirs(DB_DIR, exist_ok=True)
     db_file = PLAYERS_DB_FILE
     _create_players_table(db_file)
-    conn = sqlite3.connect(db_file)
+    conn = get_conn(db_file)
     cursor = conn.cursor()
     try:
-        cursor.execute("""
-            INSERT OR REPLACE INTO players (
-                id, firstName, lastName, gender, birthDate, ageRange, displayName, myUtrSingles, myUtrDoubles, descriptionShort
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            profile.get('id'),
-            profile.get('firstName'),
-            profile.get('lastName'),
-            profile.get('gender'),
-            profile.get('birthDate'),
-            profile.get('ageRange'),
-            profile.get('displayName'),
-            profile.get('myUtrSingles'),
-            profile.get('myUtrDoubles'),
-            profile.get('descriptionShort')
-        ))
+        cursor.execute(INSERT_PLAYER_SQL, _profile_row(profile))
         conn.commit()
         logger.info(f"Saved player profile '{player_id}' to database.")
     except sqlite3.Error as e:
+        conn.rollback()
         logger.error(f"Error saving player profile '{player_id}' to database: {e}")
-    finally:
-        conn.close()
 
-def _extract_results_data(results):
-    """Extracts relevant data from the results JSON."""
-    extracted_data = []
-    for event in results.get("events", []):
+def save_player_profiles_bulk(profiles):
+    """Save many player profiles to the SQLite database in a single transaction."""
+    db_file = PLAYERS_DB_FILE
+    _create_players_table(db_file)
+    conn = get_conn(db_file)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        cursor = conn.executemany(INSERT_PLAYER_SQL, map(_profile_row, profiles))
+        conn.commit()
+        logger.info(f"Saved {cursor.rowcount} player profiles to database.")
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.error(f"Error saving player profiles to database: {e}")
+    except BaseException:
+        # Never leave the cached connection inside an open write transaction
+        conn.rollback()
+        raise
+
+def _iter_results_data(events):
+    """Yields one row dict per result in the given events, so callers can stream them."""
+    dumps = orjson.dumps
+    for event in events:
         for draw in event.get("draws", []):
             for result in draw.get("results", []):
-                # Extract relevant fields (adjust as needed)
-                extracted_data.append({
+                yield {
                     "event_id": event.get("id"),
                     "event_name": event.get("name"),
                     "draw_id": draw.get("id"),
                     "draw_name": draw.get("name"),
                     "result_id": result.get("id"),
                     "date": result.get("date"),
-                    # "winner_id": result.get("winner", {}).get("isWinner"),
-                    # "loser_id": result.get("loser", {}).get("isWinner"),
-                    "players": json.dumps(result.get("players", {})), #stringified player info.
-                    "score": json.dumps(result.get("score", {})), #stringified score info.
+                    # Stored as JSON text in every results file, so readers only handle one encoding
+                    "players": dumps(result.get("players", {})).decode(),
+                    "score": dumps(result.get("score", {})).decode(),
                     "teamType": result.get("teamType"),
                     "sportTypeId": result.get("sportTypeId"),
                     "sourceType": result.get("sourceType"),
                     "completionType": result.get("completionType"),
                     "outcome": result.get("outcome"),
                     "finalized": result.get("finalized"),
-                })
+                }
+
+def _extract_results_data(results):
+    """Extracts relevant data from the results JSON."""
+    extracted_data = list(_iter_results_data(results.get("events", [])))
     logger.debug(f"Extracted {len(extracted_data)} results for processing.")
     return extracted_data
 
@@ -142,6 +264,17 @@ def validate_results_data(df):
     logger.debug("Results DataFrame passed validation.")
     return True
 
+def reduce_memory(df, dtypes=RESULTS_DTYPES):
+    """Downcasts the given columns to compact dtypes, leaving any that don't convert as they are."""
+    for column, dtype in dtypes.items():
+        if column not in df.columns:
+            continue
+        try:
+            df[column] = df[column].astype(dtype)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Could not convert column '{column}' to {dtype}: {e}")
+    return df
+
 def save_player_results(results, player_id):
     """Save player match results to a Parquet file, with extracted data and validation."""
     logger.info(f"Saving results for player ID: {player_id}.")
@@ -152,39 +285,117 @@ def save_player_results(results, player_id):
         if not validate_results_data(df):
             return  # Stop if validation fails
 
-        os.makedirs(DATA_DIR, exist_ok=True)
+        df = reduce_memory(df)
         file_path = os.path.join(DATA_DIR, f"player_{player_id}_results.parquet")
-        logger.info(f"Saving {player_id} results DataFrame with {len(df)} rows to Parquet file.")
+        logger.debug("Saving %s results DataFrame with %d rows to Parquet file.", player_id, len(df))
         _save_parquet(df, file_path)
     except Exception as e:
         logger.error(f"Error saving results for player {player_id}: {e}")
 
     """Save player results to json file."""
     try:
-        os.makedirs(RAW_DIR, exist_ok=True)
         file_path = os.path.join(RAW_DIR, f"player_{player_id}_results.json")
-        logger.info(f"Saving {player_id} results to json file.")
+        logger.debug("Saving %s results to json file.", player_id)
         _save_json(results, file_path)
     except Exception as e:
         logger.error(f"Error saving json results for player {player_id}: {e}")
 
+class ResultsConversionError(ValueError):
+    """Raised when a player's results rows don't fit RESULTS_SCHEMA."""
+
+def iter_results_batches(events, player_id, batch_size=RESULTS_BATCH_SIZE):
+    """Yields RecordBatches of up to batch_size results rows from an iterable of events.
+
+    Raises ResultsConversionError if a batch doesn't match RESULTS_SCHEMA; batches already
+    yielded stay valid, and the caller decides how to report it, e.g. from a worker process.
+    """
+    rows = _iter_results_data(events)
+    while chunk := list(islice(rows, batch_size)):
+        for row in chunk:
+            row["player_id"] = str(player_id)
+        try:
+            batch = pa.RecordBatch.from_pylist(chunk, schema=RESULTS_SCHEMA)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ResultsConversionError(f"Error converting results for player {player_id}: {e}") from e
+        yield batch
+
+class ResultsWriter:
+    """Streams many players' results into one Parquet file through a single ParquetWriter.
+
+    Rows are converted to RecordBatches BATCH_SIZE at a time as they are read, and buffered
+    batches are written as one row group once BATCH_SIZE rows have accumulated, so memory
+    stays bounded by a batch rather than a whole results file.
+    """
+    BATCH_SIZE = RESULTS_BATCH_SIZE
+
+    def __init__(self, file_path=COMBINED_RESULTS_FILE):
+        self.file_path = file_path
+        self._writer = None
+        self._batches = []
+        self._buffered_rows = 0
+
+    def __enter__(self):
+        ensure_dir(os.path.dirname(self.file_path))
+        options = {k: v for k, v in PARQUET_OPTIONS.items() if k != "row_group_size"}
+        self._writer = pq.ParquetWriter(self.file_path, RESULTS_SCHEMA, **options)
+        return self
+
+    def write_batch(self, batch):
+        """Buffers a RecordBatch built by iter_results_batches, e.g. in a worker process."""
+        self._batches.append(batch)
+        self._buffered_rows += batch.num_rows
+        if self._buffered_rows >= self.BATCH_SIZE:
+            self.flush()
+
+    def write_events(self, events, player_id):
+        """Adds one player's results from an iterable of events, tagged with their player_id.
+
+        If a batch doesn't match the schema it is logged and the rest of the player's results are skipped.
+        """
+        try:
+            for batch in iter_results_batches(events, player_id, self.BATCH_SIZE):
+                self.write_batch(batch)
+        except ResultsConversionError as e:
+            logger.error(str(e))
+
+    def write_results(self, results, player_id):
+        """Adds one player's already-parsed results JSON."""
+        self.write_events(results.get("events", []), player_id)
+
+    def write_results_file(self, file_path, player_id):
+        """Adds one player's results by streaming events from a raw results JSON file."""
+        with open(file_path, "rb") as f:
+            self.write_events(ijson.items(f, "events.item", use_float=True), player_id)
+
+    def flush(self):
+        """Writes the buffered batches as a single row group."""
+        if self._batches:
+            self._writer.write_table(pa.Table.from_batches(self._batches, schema=RESULTS_SCHEMA))
+            logger.debug(f"Wrote {self._buffered_rows} result rows to {self.file_path}")
+            self._batches = []
+            self._buffered_rows = 0
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.flush()
+        finally:
+            self._writer.close()
+            self._writer = None
+
 def save_player_stats(stats, player_id, match="doubles"):
     """Save player stats to parquet file."""
     logger.info(f"Saving {match} stats for player ID: {player_id}.")
     try:
-        df = pd.json_normalize(stats)
-        os.makedirs(DATA_DIR, exist_ok=True)
         file_path = os.path.join(DATA_DIR, f"player_{player_id}_{match}_stats.parquet")
-        logger.info(f"Saving {player_id} {match} stats DataFrame with {len(df)} rows to Parquet file.")
-        _save_parquet(df, file_path)
+        logger.debug("Saving %s %s stats to Parquet file.", player_id, match)
+        _save_parquet_pylist([stats], file_path)
     except Exception as e:
         logger.error(f"Error saving parquet stats for player {player_id}: {e}")
 
     """Save player stats to json file."""
     try:
-        os.makedirs(RAW_DIR, exist_ok=True)
         file_path = os.path.join(RAW_DIR, f"player_{player_id}_{match}_stats.json")
-        logger.info(f"Saved {player_id} {match} stats to json file.")
+        logger.debug("Saving %s %s stats to json file.", player_id, match)
         _save_json(stats, file_path)
     except Exception as e:
         logger.error(f"Error saving json stats for player {player_id}: {e}")
@@ -1,38 +1,116 @@
 import os
-from src.player.player_data_loader import load_player_match_stats, DB_DIR, PLAYERS_DB_FILE
-from datetime import datetime
-from src.player.player_data_loader import load_player_match_stats, DB_DIR, PLAYERS_DB_FILE
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
 # Add the project root to the Python path
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
+from src.player.player_data_loader import _iter_match_rows, bulk_load_matches, DB_DIR, PLAYERS_DB_FILE
+from src.processing.data_saver import save_player_profiles_bulk, iter_results_batches, ResultsConversionError, ResultsWriter, ensure_dir, DATA_DIR
 from src.config import configure_logging
 import logging
+import orjson
+import ijson
 
 RAW_DATA_DIR = "data/raw"
 
+logger = logging.getLogger("ingest_data")  # Use the specific logger for this script
+
+def scan_raw_files(suffix):
+    """Returns the player files in RAW_DATA_DIR ending in suffix, in inode order.
+
+    os.scandir gets the names without a stat per file, and inode order roughly follows
+    the on-disk layout so reads stay mostly sequential.
+    """
+    with os.scandir(RAW_DATA_DIR) as entries:
+        files = [
+            entry for entry in entries
+            if entry.name.startswith("player_") and entry.name.endswith(suffix) and entry.is_file()
+        ]
+    return sorted(files, key=lambda entry: entry.inode())
+
+def _process_one(player_id, file_path):
+    """Parses one results file in a worker process, streaming it once for both outputs.
+
+    Returns the player's match rows for SQLite, the RecordBatches for the combined results
+    file, and a results conversion error message or None. Worker log records aren't handled,
+    so the parent logs the error.
+    """
+    match_rows = []
+
+    def events(f):
+        for event in ijson.items(f, "events.item", use_float=True):
+            match_rows.extend(_iter_match_rows(player_id, event.get("draws", [])))
+            yield event
+
+    batches = []
+    error = None
+    with open(file_path, "rb") as f:
+        file_events = events(f)
+        try:
+            for batch in iter_results_batches(file_events, player_id):
+                batches.append(batch)
+        except ResultsConversionError as e:
+            error = str(e)
+        # Finish collecting match rows even if the results batches stopped early on a schema error
+        for _ in file_events:
+            pass
+    return match_rows, batches, error
+
+def parsed_results(futures, results_writer):
+    """Yields (player_id, rows) for each parsed file in file name order, logging failures.
+
+    bulk_load_matches keeps the first staged row for a match, so rows are staged in an order
+    that depends only on the files, not on which worker finishes first. Each file's batches
+    are also appended to the combined results Parquet file; a failure there is logged without
+    dropping the player's match rows.
+    """
+    for future, (entry, player_id) in sorted(futures.items(), key=lambda item: item[1][0].name):
+        try:
+            rows, batches, error = future.result()
+        except Exception as e:
+            logger.error(f"Error processing file {entry.name}: {e}")
+            continue
+        if error:
+            logger.error(error)
+        try:
+            for batch in batches:
+                results_writer.write_batch(batch)
+        except Exception as e:
+            logger.error(f"Error writing results for player {player_id} to {results_writer.file_path}: {e}")
+        logger.info(f"Successfully processed data for player ID: {player_id}")
+        yield player_id, rows
+
 if __name__ == "__main__":
     # Configure logging
     configure_logging()
-    logger = logging.getLogger("ingest_data")  # Use the specific logger for this script
 
     logger.info("Starting player match data ingestion...")
 
-    # Create the database directory if it doesn't exist
-    os.makedirs(DB_DIR, exist_ok=True)
-
-    # Iterate through files in the raw data directory
-    for filename in os.listdir(RAW_DATA_DIR):
-        if filename.startswith("player_") and filename.endswith("_results.json"):
-            try:
-                # Extract the player ID from the filename
-                player_id = filename.split("_")[1]
-                file_path = os.path.join(RAW_DATA_DIR, filename)
-                logger.info(f"Processing file: {filename} for player ID: {player_id}")
-                load_player_match_stats(player_id, file_path)
-                logger.info(f"Successfully processed data for player ID: {player_id}")
-            except Exception as e:
-                logger.error(f"Error processing file {filename}: {e}")
+    # Create the output directories up front
+    for directory in (DATA_DIR, DB_DIR):
+        ensure_dir(directory)
+
+    # Load every saved profile and write them to the players table in one transaction
+    profiles = []
+    for entry in scan_raw_files("_profile.json"):
+        try:
+            with open(entry.path, "rb") as f:
+                profiles.append(orjson.loads(f.read()))
+        except Exception as e:
+            logger.error(f"Error reading profile file {entry.name}: {e}")
+    save_player_profiles_bulk(profiles)
+
+    # Parse the results files in worker processes; the main process stays the only SQLite and Parquet writer
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor, ResultsWriter() as results_writer:
+        futures = {}
+        for entry in scan_raw_files("_results.json"):
+            # Extract the player ID from the filename
+            player_id = entry.name.split("_")[1]
+            logger.info(f"Processing file: {entry.name} for player ID: {player_id}")
+            futures[executor.submit(_process_one, player_id, entry.path)] = (entry, player_id)
+
+        bulk_load_matches(parsed_results(futures, results_writer))
 
     logger.info("Player match data ingestion complete.")
     logger.info(f"Match data should be in: {PLAYERS_DB_FILE}")
@@ -12,21 +12,19 @@ class Team:
         self.season = season
         self.flight = flight
         self.name = name
-        self.players = []  # Initialize an empty list to hold player IDs
+        self.players: dict[str, None] = {}  # Player IDs as an insertion-ordered set
 
     def add_player(self, player_id: str):
         """Adds a player ID to the team's roster."""
-        if player_id not in self.players:
-            self.players.append(player_id)
+        self.players.setdefault(player_id, None)
 
     def remove_player(self, player_id: str):
         """Removes a player ID from the team's roster."""
-        if player_id in self.players:
-            self.players.remove(player_id)
+        self.players.pop(player_id, None)
 
     def get_roster(self) -> list[str]:
         """Returns the current list of player IDs in the roster."""
-        return self.players
+        return list(self.players)
 
     def __str__(self):
         return f"Team Name: {self.name} ({self.year} {self.league_type} - Flight {self.flight})"
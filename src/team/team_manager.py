@@ -1,10 +1,20 @@
 import sqlite3
 import os
 from src.team.team import Team
-from src.player.player_data_loader import load_player_profile_from_db
+from src.processing.connections import get_conn
+from src.player.player_data_loader import load_multiple_player_profiles_from_db
 
 DB_DIR = "data/db"
 
+# Columns of the teams table; they match the Team constructor's parameter names
+TEAM_COLUMNS = ("team_number", "year", "league_type", "section", "district", "area", "season", "flight", "name")
+
+GET_TEAM_SQL = f"""
+    SELECT {", ".join(f"t.{column}" for column in TEAM_COLUMNS)}, p.player_id
+    FROM teams t LEFT JOIN team_players p USING (team_number)
+    WHERE t.team_number=?
+"""
+
 class TeamManager:
     def __init__(self, db_file: str = os.path.join(DB_DIR, 'teams.db')):
         os.makedirs(DB_DIR, exist_ok=True)  # Ensure the directory exists
@@ -13,7 +23,7 @@ class TeamManager:
 
     def _create_tables(self):
         """Creates the teams and team_players tables if they don't exist."""
-        conn = sqlite3.connect(self.db_file)
+        conn = get_conn(self.db_file, foreign_keys=True)
         cursor = conn.cursor()
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS teams (
@@ -37,7 +47,6 @@ class TeamManager:
             )
         """)
         conn.commit()
-        conn.close()
 
     def create_team(self, team_number: str, year: int, league_type: str, section: str,
                     district: str, area: str, season: str, flight: str, name: str) -> Team:
@@ -48,7 +57,7 @@ class TeamManager:
 
     def _add_team_basic_info_to_db(self, team: Team):
         """Adds a Team object's basic data to the teams table."""
-        conn = sqlite3.connect(self.db_file)
+        conn = get_conn(self.db_file, foreign_keys=True)
         cursor = conn.cursor()
         try:
             cursor.execute("""
@@ -58,35 +67,31 @@ class TeamManager:
                   team.area, team.season, team.flight, team.name))
             conn.commit()
         except sqlite3.IntegrityError:
+            conn.rollback()
             print(f"Warning: Team with number '{team.team_number}' already exists.")
-        finally:
-            conn.close()
 
     def get_team(self, team_number: str) -> Team | None:
         """Retrieves a Team object from the database by its team number, including players."""
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
+        cursor = get_conn(self.db_file, foreign_keys=True).cursor()
+        # One round-trip for the team and its roster; a team with no players yields one row with a NULL player_id
+        cursor.execute(GET_TEAM_SQL, (team_number,))
+        rows = cursor.fetchall()
+        if not rows:
+            return None
 
-        # Retrieve basic team info
-        cursor.execute("SELECT * FROM teams WHERE team_number=?", (team_number,))
-        team_row = cursor.fetchone()
-
-        if team_row:
-            team = Team(*team_row)
-            # Retrieve players for this team
-            cursor.execute("SELECT player_id FROM team_players WHERE team_number=?", (team_number,))
-            player_rows = cursor.fetchall()
-            for row in player_rows:
-                team.add_player(row[0])
-            conn.close()
-            return team
+        team = Team(**{column: rows[0][column] for column in TEAM_COLUMNS})
+        for row in rows:
+            if row["player_id"] is not None:
+                team.add_player(row["player_id"])
+        return team
 
-        conn.close()
-        return None
+    def add_player_to_team(self, team: Team | str, player_id: str):
+        """Adds a player to a team's roster in the database.
 
-    def add_player_to_team(self, team_number: str, player_id: str):
-        """Adds a player to a team's roster in the database."""
-        conn = sqlite3.connect(self.db_file)
+        team may be a Team object, which is updated in place, or just a team number.
+        """
+        team_number = team.team_number if isinstance(team, Team) else team
+        conn = get_conn(self.db_file, foreign_keys=True)
         cursor = conn.cursor()
         try:
             cursor.execute("""
@@ -94,34 +99,56 @@ class TeamManager:
                 VALUES (?, ?)
             """, (team_number, player_id))
             conn.commit()
-        except sqlite3.IntegrityError:
+        except sqlite3.IntegrityError as e:
+            conn.rollback()
+            # With foreign keys on, a missing team fails here too; only a primary key clash is a duplicate
+            if e.sqlite_errorname != "SQLITE_CONSTRAINT_PRIMARYKEY":
+                print(f"Warning: Could not add player '{player_id}' to team '{team_number}': {e}")
+                return
             print(f"Warning: Player '{player_id}' is already on team '{team_number}'.")
-        finally:
-            conn.close()
-            # Update the in-memory Team object if it exists
-            team = self.get_team(team_number)
-            if team and player_id not in team.players:
+        if isinstance(team, Team):
+            team.add_player(player_id)
+
+    def add_players_to_team_bulk(self, team: Team | str, player_ids: list[str]):
+        """Adds several players to a team's roster in one transaction, skipping any already on it."""
+        team_number = team.team_number if isinstance(team, Team) else team
+        conn = get_conn(self.db_file, foreign_keys=True)
+        cursor = conn.cursor()
+        try:
+            cursor.executemany("""
+                INSERT OR IGNORE INTO team_players (team_number, player_id)
+                VALUES (?, ?)
+            """, [(team_number, player_id) for player_id in player_ids])
+            conn.commit()
+        except sqlite3.IntegrityError as e:
+            conn.rollback()
+            print(f"Warning: Could not add players to team '{team_number}': {e}")
+            return
+        if isinstance(team, Team):
+            for player_id in player_ids:
                 team.add_player(player_id)
 
-    def remove_player_from_team(self, team_number: str, player_id: str):
-        """Removes a player from a team's roster in the database."""
-        conn = sqlite3.connect(self.db_file)
+    def remove_player_from_team(self, team: Team | str, player_id: str):
+        """Removes a player from a team's roster in the database.
+
+        team may be a Team object, which is updated in place, or just a team number.
+        """
+        team_number = team.team_number if isinstance(team, Team) else team
+        conn = get_conn(self.db_file, foreign_keys=True)
         cursor = conn.cursor()
         cursor.execute("DELETE FROM team_players WHERE team_number=? AND player_id=?", (team_number, player_id))
         conn.commit()
-        conn.close()
-        # Update the in-memory Team object if it exists
-        team = self.get_team(team_number)
-        if team and player_id in team.players:
+        if isinstance(team, Team):
             team.remove_player(player_id)
 
     def populate_roster(self, team: Team, player_ids: list[str]):
         """Loads player IDs and attempts to fetch their profiles from the database."""
-        for player_id in player_ids:
-            profile = load_player_profile_from_db(player_id)
-            if profile:
-                if player_id not in team.players:
-                    team.add_player(player_id)
-                print(f"Loaded profile for player '{player_id}' for team '{team.name}' from database.")
-            else:
-                print(f"Warning: No profile found in database for player ID '{player_id}'.")
+        # players.id is TEXT, so compare as strings whatever type the caller passed
+        player_ids = [str(player_id) for player_id in player_ids]
+        profiles = {str(profile_id): profile for profile_id, profile in load_multiple_player_profiles_from_db(player_ids).items()}
+        found = [player_id for player_id in player_ids if player_id in profiles]
+        team.players.update(dict.fromkeys(found))
+        print(f"Loaded {len(found)} player profiles for team '{team.name}' from database.")
+        missing = [player_id for player_id in player_ids if player_id not in profiles]
+        if missing:
+            print(f"Warning: No profile found in database for player IDs: {', '.join(missing)}.")
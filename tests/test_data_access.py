@@ -1,7 +1,6 @@
 import unittest
 from unittest.mock import patch, mock_open
 import pandas as pd
-import json
 import os
 from src.data_access import load_player_results, load_player_stats, load_player_profile
 
@@ -20,7 +19,20 @@ class TestDataAccessLoadPlayerResults(unittest.TestCase):
 
         self.assertTrue(expected_df.equals(actual_df))
         mock_os_path_join.assert_called_once_with("data/processed", f"player_{player_id}_results.parquet")
-        mock_read_parquet.assert_called_once_with(f"data/processed/player_{player_id}_results.parquet")
+        mock_read_parquet.assert_called_once_with(f"data/processed/player_{player_id}_results.parquet", columns=None, engine="pyarrow")
+
+    @patch('pandas.read_parquet')
+    @patch('os.path.join')
+    def test_load_player_results_column_projection(self, mock_os_path_join, mock_read_parquet):
+        """Test that requested columns are passed through to the Parquet reader."""
+        player_id = "test_player"
+        columns = ['event_id', 'players', 'date', 'event_name']
+        mock_read_parquet.return_value = pd.DataFrame(columns=columns)
+        mock_os_path_join.return_value = f"data/processed/player_{player_id}_results.parquet"
+
+        load_player_results(player_id, columns=columns)
+
+        mock_read_parquet.assert_called_once_with(f"data/processed/player_{player_id}_results.parquet", columns=columns, engine="pyarrow")
 
     @patch('pandas.read_parquet')
     @patch('os.path.join')
@@ -34,7 +46,7 @@ class TestDataAccessLoadPlayerResults(unittest.TestCase):
 
         self.assertIsNone(result)
         mock_os_path_join.assert_called_once_with("data/processed", f"player_{player_id}_results.parquet")
-        mock_read_parquet.assert_called_once_with(f"data/processed/player_{player_id}_results.parquet")
+        mock_read_parquet.assert_called_once_with(f"data/processed/player_{player_id}_results.parquet", columns=None, engine="pyarrow")
         self.assertLogs('src.data_access', level='ERROR')
 
     @patch('pandas.read_parquet')
@@ -49,7 +61,7 @@ class TestDataAccessLoadPlayerResults(unittest.TestCase):
 
         self.assertIsNone(result)
         mock_os_path_join.assert_called_once_with("data/processed", f"player_{player_id}_results.parquet")
-        mock_read_parquet.assert_called_once_with(f"data/processed/player_{player_id}_results.parquet")
+        mock_read_parquet.assert_called_once_with(f"data/processed/player_{player_id}_results.parquet", columns=None, engine="pyarrow")
         self.assertLogs('src.data_access', level='ERROR')
 
     pass
@@ -57,22 +69,19 @@ class TestDataAccessLoadPlayerResults(unittest.TestCase):
 class TestDataAccessLoadPlayerStats(unittest.TestCase):
 
     @patch('os.path.join')
-    @patch('builtins.open', new_callable=mock_open, read_data='{"stats": [{"type": "singles", "wins": 10}]}')
-    @patch('json.load')
-    def test_load_player_stats_success(self, mock_json_load, mock_file, mock_os_path_join):
+    @patch('builtins.open', new_callable=mock_open, read_data=b'{"stats": [{"type": "singles", "wins": 10}]}')
+    def test_load_player_stats_success(self, mock_file, mock_os_path_join):
         """Test successful loading of player stats."""
         player_id = "test_player"
         match_type = "singles"
         expected_stats = {"stats": [{"type": "singles", "wins": 10}]}
-        mock_json_load.return_value = expected_stats
         mock_os_path_join.return_value = f"data/raw/player_{player_id}_{match_type}_stats.json"
 
         actual_stats = load_player_stats(player_id, match_type)
 
         self.assertEqual(actual_stats, expected_stats)
         mock_os_path_join.assert_called_once_with("data/raw", f"player_{player_id}_{match_type}_stats.json")
-        mock_file.assert_called_once_with(f"data/raw/player_{player_id}_{match_type}_stats.json", "r")
-        mock_json_load.assert_called_once_with(mock_file.return_value)
+        mock_file.assert_called_once_with(f"data/raw/player_{player_id}_{match_type}_stats.json", "rb")
 
     @patch('os.path.join')
     @patch('builtins.open', side_effect=FileNotFoundError())
@@ -86,13 +95,12 @@ class TestDataAccessLoadPlayerStats(unittest.TestCase):
 
         self.assertIsNone(result)
         mock_os_path_join.assert_called_once_with("data/raw", f"player_{player_id}_{match_type}_stats.json")
-        mock_file.assert_called_once_with(f"data/raw/player_{player_id}_{match_type}_stats.json", "r")
+        mock_file.assert_called_once_with(f"data/raw/player_{player_id}_{match_type}_stats.json", "rb")
         self.assertLogs('src.data_access', level='ERROR')
 
     @patch('os.path.join')
-    @patch('builtins.open', new_callable=mock_open, read_data='{"stats": "invalid json"}')
-    @patch('json.load', side_effect=json.JSONDecodeError("Expecting value", '{"stats": "invalid json"}', 10))
-    def test_load_player_stats_invalid_json(self, mock_json_load, mock_file, mock_os_path_join):
+    @patch('builtins.open', new_callable=mock_open, read_data=b'{"stats": invalid json}')
+    def test_load_player_stats_invalid_json(self, mock_file, mock_os_path_join):
         """Test when the player stats file contains invalid JSON."""
         player_id = "bad_json_player"
         match_type = "singles"
@@ -102,8 +110,7 @@ class TestDataAccessLoadPlayerStats(unittest.TestCase):
 
         self.assertIsNone(result)
         mock_os_path_join.assert_called_once_with("data/raw", f"player_{player_id}_{match_type}_stats.json")
-        mock_file.assert_called_once_with(f"data/raw/player_{player_id}_{match_type}_stats.json", "r")
-        mock_json_load.assert_called_once_with(mock_file.return_value)
+        mock_file.assert_called_once_with(f"data/raw/player_{player_id}_{match_type}_stats.json", "rb")
         self.assertLogs('src.data_access', level='ERROR')
 
     @patch('os.path.join')
@@ -118,7 +125,7 @@ class TestDataAccessLoadPlayerStats(unittest.TestCase):
 
         self.assertIsNone(result)
         mock_os_path_join.assert_called_once_with("data/raw", f"player_{player_id}_{match_type}_stats.json")
-        mock_file.assert_called_once_with(f"data/raw/player_{player_id}_{match_type}_stats.json", "r")
+        mock_file.assert_called_once_with(f"data/raw/player_{player_id}_{match_type}_stats.json", "rb")
         self.assertLogs('src.data_access', level='ERROR')
 
     pass
@@ -138,7 +145,7 @@ class TestDataAccessLoadPlayerProfile(unittest.TestCase):
 
         self.assertTrue(expected_df.equals(actual_df))
         mock_os_path_join.assert_called_once_with("data/processed", f"player_{player_id}_profile.parquet")
-        mock_read_parquet.assert_called_once_with(f"data/processed/player_{player_id}_profile.parquet")
+        mock_read_parquet.assert_called_once_with(f"data/processed/player_{player_id}_profile.parquet", columns=None, engine="pyarrow")
 
     @patch('pandas.read_parquet')
     @patch('os.path.join')
@@ -152,7 +159,7 @@ class TestDataAccessLoadPlayerProfile(unittest.TestCase):
 
         self.assertIsNone(result)
         mock_os_path_join.assert_called_once_with("data/processed", f"player_{player_id}_profile.parquet")
-        mock_read_parquet.assert_called_once_with(f"data/processed/player_{player_id}_profile.parquet")
+        mock_read_parquet.assert_called_once_with(f"data/processed/player_{player_id}_profile.parquet", columns=None, engine="pyarrow")
         self.assertLogs('src.data_access', level='ERROR')
 
     @patch('pandas.read_parquet')
@@ -167,7 +174,7 @@ class TestDataAccessLoadPlayerProfile(unittest.TestCase):
 
         self.assertIsNone(result)
         mock_os_path_join.assert_called_once_with("data/processed", f"player_{player_id}_profile.parquet")
-        mock_read_parquet.assert_called_once_with(f"data/processed/player_{player_id}_profile.parquet")
+        mock_read_parquet.assert_called_once_with(f"data/processed/player_{player_id}_profile.parquet", columns=None, engine="pyarrow")
         self.assertLogs('src.data_access', level='ERROR')
 
 if __name__ == '__main__':
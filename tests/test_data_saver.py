@@ -1,15 +1,19 @@
 import unittest
 from unittest.mock import patch, mock_open, MagicMock
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet
 import json
+import orjson
 import os
 import logging
 import sqlite3
 import tempfile
-from src.processing.data_saver import _save_parquet, _save_json, save_player_profile, _extract_results_data, validate_results_data, save_player_results, save_player_profile
+from src.processing import data_saver
+from src.processing.data_saver import ResultsWriter, reduce_memory, PARQUET_OPTIONS, save_player_profiles_bulk, _save_parquet_pylist, _save_parquet, _save_json, save_player_profile, _extract_results_data, validate_results_data, save_player_results, save_player_profile
 from src.team.team import Team
 from src.team.team_manager import TeamManager
-from src.player.player_data_loader import load_player_profile_from_db, load_multiple_player_profiles_from_db
+from src.player.player_data_loader import load_player_profile_from_db, load_multiple_player_profiles_from_db, close_connections
 
 class TestDataSaverSaveParquet(unittest.TestCase):
 
@@ -22,7 +26,7 @@ class TestDataSaverSaveParquet(unittest.TestCase):
 
         _save_parquet(df, file_path)
 
-        mock_to_parquet.assert_called_once_with(file_path, engine="pyarrow", index=False)
+        mock_to_parquet.assert_called_once_with(file_path, engine="pyarrow", index=False, **PARQUET_OPTIONS)
         mock_logger.debug.assert_any_call(f"Saving DataFrame with {len(df)} rows to {file_path}")
         mock_logger.debug.assert_any_call(f"Successfully saved DataFrame to {file_path}")
         mock_logger.error.assert_not_called()
@@ -38,34 +42,91 @@ class TestDataSaverSaveParquet(unittest.TestCase):
 
         _save_parquet(df, file_path)
 
-        mock_to_parquet.assert_called_once_with(file_path, engine="pyarrow", index=False)
+        mock_to_parquet.assert_called_once_with(file_path, engine="pyarrow", index=False, **PARQUET_OPTIONS)
         mock_logger.debug.assert_any_call(f"Saving DataFrame with {len(df)} rows to {file_path}")
         mock_logger.error.assert_called_once_with(f"Error saving DataFrame to {file_path}: {error_message}")
 
     pass
 
+class TestEnsureDir(unittest.TestCase):
+
+    @patch('os.makedirs')
+    def test_ensure_dir_creates_each_directory_once(self, mock_makedirs):
+        """Test that repeated calls only create a directory the first time."""
+        with patch.object(data_saver, "_created_dirs", set()):
+            data_saver.ensure_dir("some/dir")
+            data_saver.ensure_dir("some/dir")
+            data_saver.ensure_dir("")
+
+        mock_makedirs.assert_called_once_with("some/dir", exist_ok=True)
+
+class TestDataSaverSaveParquetPylist(unittest.TestCase):
+
+    def test_save_parquet_pylist_encodes_nested_fields(self):
+        """Test that nested values, even empty or mixed-type ones, are written as JSON text columns."""
+        record = {"id": 1, "firstName": "Alpha", "ratings": {"singles": 5.5}, "settings": {}, "tags": [1, "a"]}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "profile.parquet")
+            _save_parquet_pylist([record], file_path)
+            table = pa.parquet.read_table(file_path)
+        self.assertEqual(table.column_names, ["id", "firstName", "ratings", "settings", "tags"])
+        self.assertEqual(table.to_pylist(), [{"id": 1, "firstName": "Alpha", "ratings": '{"singles":5.5}', "settings": "{}", "tags": '[1,"a"]'}])
+
 class TestDataSaverSaveJson(unittest.TestCase):
 
-    @patch('json.dump')
     @patch('builtins.open', new_callable=mock_open)
     @patch('src.processing.data_saver.logger')
-    def test_save_json_success(self, mock_logger, mock_open_file, mock_json_dump):
+    @patch('src.processing.data_saver._stored_hash', return_value=None)
+    @patch('src.processing.data_saver._store_hash')
+    def test_save_json_success(self, mock_store_hash, mock_stored_hash, mock_logger, mock_open_file):
         """Test successful saving of data to JSON."""
         contents = {"key": "value"}
         file_path = "test_path.json"
 
         _save_json(contents, file_path)
 
-        mock_open_file.assert_called_once_with(file_path, "w")
-        mock_json_dump.assert_called_once_with(contents, mock_open_file.return_value, indent=2)
+        mock_open_file.assert_called_once_with(file_path, "wb")
+        mock_open_file.return_value.write.assert_called_once_with(b'{"key":"value"}')
         mock_logger.debug.assert_any_call(f"Saving JSON data to {file_path}")
         mock_logger.debug.assert_any_call(f"Successfully saved raw json to {file_path}")
+        mock_store_hash.assert_called_once()
+        mock_logger.error.assert_not_called()
+
+    @patch('builtins.open', new_callable=mock_open)
+    @patch('src.processing.data_saver.logger')
+    @patch('src.processing.data_saver._stored_hash', return_value=None)
+    @patch('src.processing.data_saver._store_hash')
+    def test_save_json_pretty(self, mock_store_hash, mock_stored_hash, mock_logger, mock_open_file):
+        """Test that pretty=True writes indented JSON."""
+        _save_json({"key": "value"}, "test_path.json", pretty=True)
+
+        mock_open_file.return_value.write.assert_called_once_with(b'{\n  "key": "value"\n}')
+
+    @patch('src.processing.data_saver.logger')
+    def test_save_json_skips_unchanged_contents(self, mock_logger):
+        """Test that an unchanged payload is not rewritten once its hash sidecar exists."""
+        contents = {"key": "value", "nested": [1, 2]}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "test_path.json")
+
+            _save_json(contents, file_path)
+            self.assertTrue(os.path.exists(f"{file_path}.hash"))
+            first_mtime = os.stat(file_path).st_mtime_ns
+
+            _save_json(dict(reversed(list(contents.items()))), file_path)
+            self.assertEqual(os.stat(file_path).st_mtime_ns, first_mtime)
+            mock_logger.debug.assert_any_call(f"Raw json at {file_path} is unchanged, skipping write")
+
+            _save_json({"key": "changed"}, file_path)
+            with open(file_path) as f:
+                self.assertEqual(json.load(f), {"key": "changed"})
         mock_logger.error.assert_not_called()
 
-    @patch('json.dump')
     @patch('builtins.open', new_callable=mock_open)
     @patch('src.processing.data_saver.logger')
-    def test_save_json_error(self, mock_logger, mock_open_file, mock_json_dump):
+    @patch('src.processing.data_saver._stored_hash', return_value=None)
+    @patch('src.processing.data_saver._store_hash')
+    def test_save_json_error(self, mock_store_hash, mock_stored_hash, mock_logger, mock_open_file):
         """Test error during saving of data to JSON."""
         contents = {"key": "value"}
         file_path = "test_path.json"
@@ -74,8 +135,8 @@ class TestDataSaverSaveJson(unittest.TestCase):
 
         _save_json(contents, file_path)
 
-        mock_open_file.assert_called_once_with(file_path, "w")
-        mock_json_dump.assert_not_called()
+        mock_open_file.assert_called_once_with(file_path, "wb")
+        mock_store_hash.assert_not_called()
         mock_logger.debug.assert_any_call(f"Saving JSON data to {file_path}")
         mock_logger.error.assert_called_once_with(f"Error saving raw json to {file_path}: {error_message}")
 
@@ -83,16 +144,28 @@ class TestDataSaverSaveJson(unittest.TestCase):
 
 class TestDataSaverSavePlayerProfile(unittest.TestCase):
 
+    def setUp(self):
+        """Point the players database at a temporary directory that counts as already created."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.addCleanup(data_saver.close_connections)
+        for patcher in (
+            patch.object(data_saver, "PLAYERS_DB_FILE", os.path.join(temp_dir.name, "players.db")),
+            patch.object(data_saver, "_created_dirs", {temp_dir.name}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
     @patch('src.processing.data_saver.logger')
-    @patch('pandas.json_normalize')
+    @patch('src.processing.data_saver._records_to_table')
     @patch('os.makedirs')
     @patch('os.path.join')
     @patch('src.processing.data_saver._save_json')
     @patch('src.processing.data_saver._save_parquet')
-    def test_save_player_profile_success(self, mock_save_parquet, mock_save_json, mock_os_path_join, mock_makedirs, mock_json_normalize, mock_logger):
+    def test_save_player_profile_success(self, mock_save_parquet, mock_save_json, mock_os_path_join, mock_makedirs, mock_records_to_table, mock_logger):
         """Test successful saving of player profile to Parquet and JSON."""
-        expected_df = pd.DataFrame({'col1': [1], 'col2': [2]})
-        mock_json_normalize.return_value = expected_df
+        expected_table = pa.table({'col1': [1], 'col2': [2]})
+        mock_records_to_table.return_value = expected_table
         mock_os_path_join.side_effect = ["data/processed/player_test_profile.parquet", "data/raw/player_test_profile.json"]
 
         profile = {"name": "Test Player", "level": 10}
@@ -101,29 +174,28 @@ class TestDataSaverSavePlayerProfile(unittest.TestCase):
         save_player_profile(profile, player_id)
 
         mock_logger.info.assert_any_call(f"Saving profile for player ID: {player_id}.")
-        mock_json_normalize.assert_called_once_with(profile)
-        mock_makedirs.assert_any_call("data/processed", exist_ok=True)
+        mock_records_to_table.assert_called_once_with([profile])
+        mock_makedirs.assert_not_called()
         mock_os_path_join.assert_any_call("data/processed", f"player_{player_id}_profile.parquet")
-        mock_logger.info.assert_any_call(f"Saving {player_id} profile to Parquet file.")
+        mock_logger.debug.assert_any_call("Saving %s profile to Parquet file.", player_id)
         mock_save_parquet.assert_called_once()
         call_args_parquet = mock_save_parquet.call_args[0]
-        self.assertTrue(call_args_parquet[0].equals(expected_df))
+        self.assertTrue(call_args_parquet[0].equals(expected_table))
         self.assertEqual(call_args_parquet[1], "data/processed/player_test_profile.parquet")
-        mock_makedirs.assert_any_call("data/raw", exist_ok=True)
         mock_os_path_join.assert_any_call("data/raw", f"player_{player_id}_profile.json")
-        mock_logger.info.assert_any_call(f"Saving {player_id} profile to json file.")
+        mock_logger.debug.assert_any_call("Saving %s profile to json file.", player_id)
         mock_save_json.assert_called_once_with(profile, "data/raw/player_test_profile.json")
         mock_logger.error.assert_not_called()
 
     @patch('src.processing.data_saver.logger')
-    @patch('pandas.json_normalize')
+    @patch('src.processing.data_saver._records_to_table')
     @patch('os.makedirs')
     @patch('os.path.join')
     @patch('src.processing.data_saver._save_json')
     @patch('src.processing.data_saver._save_parquet', side_effect=Exception("Parquet save failed"))
-    def test_save_player_profile_parquet_error(self, mock_save_parquet, mock_save_json, mock_os_path_join, mock_makedirs, mock_json_normalize, mock_logger):
+    def test_save_player_profile_parquet_error(self, mock_save_parquet, mock_save_json, mock_os_path_join, mock_makedirs, mock_records_to_table, mock_logger):
         """Test when an error occurs during Parquet saving in save_player_profile."""
-        mock_json_normalize.return_value = pd.DataFrame({'col1': [1], 'col2': [2]})
+        mock_records_to_table.return_value = pa.table({'col1': [1], 'col2': [2]})
         mock_os_path_join.side_effect = ["data/processed/player_test_profile.parquet", "data/raw/player_test_profile.json"]
 
         profile = {"name": "Test Player", "level": 10}
@@ -132,29 +204,28 @@ class TestDataSaverSavePlayerProfile(unittest.TestCase):
         save_player_profile(profile, player_id)
 
         mock_logger.info.assert_any_call(f"Saving profile for player ID: {player_id}.")
-        mock_json_normalize.assert_called_once_with(profile)
-        mock_makedirs.assert_any_call("data/processed", exist_ok=True)
+        mock_records_to_table.assert_called_once_with([profile])
+        mock_makedirs.assert_not_called()
         mock_os_path_join.assert_any_call("data/processed", f"player_{player_id}_profile.parquet")
-        mock_logger.info.assert_any_call(f"Saving {player_id} profile to Parquet file.")
+        mock_logger.debug.assert_any_call("Saving %s profile to Parquet file.", player_id)
         mock_save_parquet.assert_called_once()
         # We don't need to assert the arguments of mock_save_parquet here as we're focusing on the error
 
-        mock_makedirs.assert_any_call("data/raw", exist_ok=True)
         mock_os_path_join.assert_any_call("data/raw", f"player_{player_id}_profile.json")
-        mock_logger.info.assert_any_call(f"Saving {player_id} profile to json file.")
+        mock_logger.debug.assert_any_call("Saving %s profile to json file.", player_id)
         mock_save_json.assert_called_once_with(profile, "data/raw/player_test_profile.json")
         mock_logger.error.assert_any_call(f"Error saving parquet profile for player {player_id}: Parquet save failed")
 
     @patch('src.processing.data_saver.logger')
-    @patch('pandas.json_normalize')
+    @patch('src.processing.data_saver._records_to_table')
     @patch('os.makedirs')
     @patch('os.path.join')
     @patch('src.processing.data_saver._save_json', side_effect=Exception("JSON save failed"))
     @patch('src.processing.data_saver._save_parquet')
-    def test_save_player_profile_json_error(self, mock_save_parquet, mock_save_json, mock_os_path_join, mock_makedirs, mock_json_normalize, mock_logger):
+    def test_save_player_profile_json_error(self, mock_save_parquet, mock_save_json, mock_os_path_join, mock_makedirs, mock_records_to_table, mock_logger):
         """Test when an error occurs during JSON saving in save_player_profile."""
-        expected_df = pd.DataFrame({'col1': [1], 'col2': [2]})
-        mock_json_normalize.return_value = expected_df
+        expected_table = pa.table({'col1': [1], 'col2': [2]})
+        mock_records_to_table.return_value = expected_table
         mock_os_path_join.side_effect = ["data/processed/player_test_profile.parquet", "data/raw/player_test_profile.json"]
 
         profile = {"name": "Test Player", "level": 10}
@@ -163,44 +234,20 @@ class TestDataSaverSavePlayerProfile(unittest.TestCase):
         save_player_profile(profile, player_id)
 
         mock_logger.info.assert_any_call(f"Saving profile for player ID: {player_id}.")
-        mock_json_normalize.assert_called_once_with(profile)
-        mock_makedirs.assert_any_call("data/processed", exist_ok=True)
+        mock_records_to_table.assert_called_once_with([profile])
+        mock_makedirs.assert_not_called()
         mock_os_path_join.assert_any_call("data/processed", f"player_{player_id}_profile.parquet")
-        mock_logger.info.assert_any_call(f"Saving {player_id} profile to Parquet file.")
+        mock_logger.debug.assert_any_call("Saving %s profile to Parquet file.", player_id)
         mock_save_parquet.assert_called_once()
         call_args_parquet = mock_save_parquet.call_args[0]
-        self.assertTrue(call_args_parquet[0].equals(expected_df))
+        self.assertTrue(call_args_parquet[0].equals(expected_table))
         self.assertEqual(call_args_parquet[1], "data/processed/player_test_profile.parquet")
 
-        mock_makedirs.assert_any_call("data/raw", exist_ok=True)
         mock_os_path_join.assert_any_call("data/raw", f"player_{player_id}_profile.json")
-        mock_logger.info.assert_any_call(f"Saving {player_id} profile to json file.")
+        mock_logger.debug.assert_any_call("Saving %s profile to json file.", player_id)
         mock_save_json.assert_called_once_with(profile, "data/raw/player_test_profile.json")
         mock_logger.error.assert_any_call(f"Error saving json profile for player {player_id}: JSON save failed")
 
-    @patch('src.processing.data_saver.logger')
-    @patch('pandas.json_normalize')
-    @patch('os.makedirs', side_effect=[OSError("Cannot create directory: data/processed"), None, None])
-    @patch('os.path.join', side_effect=lambda *args: "data/processed/player_test_profile.parquet" if "processed" in args[0] else "data/raw/player_test_profile.json")
-    @patch('src.processing.data_saver._save_json')
-    @patch('src.processing.data_saver._save_parquet')
-    def test_save_player_profile_parquet_makedirs_error(self, mock_save_parquet, mock_save_json, mock_os_path_join, mock_makedirs, mock_json_normalize, mock_logger):
-        """Test when os.makedirs raises an error for the Parquet directory."""
-        mock_json_normalize.return_value = pd.DataFrame({'col1': [1], 'col2': [2]})
-
-        profile = {"name": "Test Player", "level": 10}
-        player_id = "test_player"
-
-        save_player_profile(profile, player_id)
-
-        mock_logger.info.assert_any_call(f"Saving profile for player ID: {player_id}.")
-        mock_json_normalize.assert_called_once_with(profile)
-        mock_makedirs.assert_any_call("data/processed", exist_ok=True)
-        mock_makedirs.assert_any_call("data/raw", exist_ok=True)
-        mock_save_parquet.assert_not_called()
-        mock_save_json.assert_called_once_with(profile, "data/raw/player_test_profile.json")
-        mock_logger.error.assert_any_call(f"Error saving parquet profile for player {player_id}: Cannot create directory: data/processed")
-
     pass
 
 class TestExtractResultsData(unittest.TestCase):
@@ -284,8 +331,8 @@ class TestExtractResultsData(unittest.TestCase):
                 "draw_name": "Main Draw",
                 "result_id": None,
                 "date": None,
-                "players": json.dumps({"player1": "Alice", "player2": "Bob"}),
-                "score": json.dumps({"score": "6-3, 7-5"}),
+                "players": orjson.dumps({"player1": "Alice", "player2": "Bob"}).decode(),
+                "score": orjson.dumps({"score": "6-3, 7-5"}).decode(),
                 "teamType": None,
                 "sportTypeId": None,
                 "sourceType": None,
@@ -300,8 +347,8 @@ class TestExtractResultsData(unittest.TestCase):
                 "draw_name": "Main Draw",
                 "result_id": None,
                 "date": None,
-                "players": json.dumps({"player1": "Charlie", "player2": "David"}),
-                "score": json.dumps({"score": "7-6(2), 6-4"}),
+                "players": orjson.dumps({"player1": "Charlie", "player2": "David"}).decode(),
+                "score": orjson.dumps({"score": "7-6(2), 6-4"}).decode(),
                 "teamType": None,
                 "sportTypeId": None,
                 "sourceType": None,
@@ -342,8 +389,8 @@ class TestExtractResultsData(unittest.TestCase):
                 "draw_name": "Draw Without ID",
                 "result_id": None,
                 "date": None,
-                "players": json.dumps({"player1": "Ivy", "player2": "Jack"}),
-                "score": json.dumps({"score": "6-0, 6-0"}),
+                "players": orjson.dumps({"player1": "Ivy", "player2": "Jack"}).decode(),
+                "score": orjson.dumps({"score": "6-0, 6-0"}).decode(),
                 "teamType": None,
                 "sportTypeId": None,
                 "sourceType": None,
@@ -434,8 +481,50 @@ class TestValidateResultsData(unittest.TestCase):
 
     pass
 
+class TestReduceMemory(unittest.TestCase):
+
+    def test_reduce_memory_downcasts_known_columns(self):
+        """Test that low-cardinality and flag columns get compact dtypes, missing values included."""
+        df = pd.DataFrame({
+            "event_id": [1, 2, 3],
+            "teamType": ["S", "D", None],
+            "sportTypeId": [1, None, 1],
+            "finalized": [True, None, False],
+        })
+
+        df = reduce_memory(df)
+
+        self.assertIsInstance(df["teamType"].dtype, pd.CategoricalDtype)
+        self.assertEqual(str(df["sportTypeId"].dtype), "Int16")
+        self.assertEqual(str(df["finalized"].dtype), "boolean")
+        self.assertEqual(df["event_id"].dtype, "int64")
+
+    @patch('src.processing.data_saver.logger')
+    def test_reduce_memory_leaves_unconvertible_columns(self, mock_logger):
+        """Test that a column that can't be converted is left as is with a warning."""
+        df = pd.DataFrame({"sportTypeId": ["tennis", "pickleball"]})
+
+        df = reduce_memory(df)
+
+        self.assertEqual(df["sportTypeId"].tolist(), ["tennis", "pickleball"])
+        mock_logger.warning.assert_called_once()
+
 class TestSavePlayerResults(unittest.TestCase):
 
+    @patch('src.processing.data_saver._save_json')
+    def test_save_player_results_writes_empty_nested_values(self, mock_save_json):
+        """Test that results with empty players/score are written, as JSON text like the combined file."""
+        results = {"events": [{"id": 1, "name": "Event", "draws": [{"id": "d1", "name": "Draw", "results": [
+            {"id": 10, "date": "2024-01-01", "players": {}, "score": {}},
+            {"id": 11, "date": "2024-01-02", "players": {"winner1": {"id": 1}, "winner2": None}},
+        ]}]}]}
+        with tempfile.TemporaryDirectory() as tmp_dir, patch.object(data_saver, "DATA_DIR", tmp_dir):
+            save_player_results(results, "p1")
+            table = pa.parquet.read_table(os.path.join(tmp_dir, "player_p1_results.parquet"))
+
+        self.assertEqual(table.column("players").to_pylist(), ["{}", '{"winner1":{"id":1},"winner2":null}'])
+        self.assertEqual(table.column("score").to_pylist(), ["{}", "{}"])
+
     @patch('src.processing.data_saver._save_json')
     @patch('src.processing.data_saver._save_parquet')
     @patch('src.processing.data_saver.validate_results_data')
@@ -461,11 +550,10 @@ class TestSavePlayerResults(unittest.TestCase):
         mock_extract.assert_called_once_with(results)
         pd.testing.assert_frame_equal(pd.DataFrame(extracted_data), pd.DataFrame(mock_save_parquet.call_args[0][0]))
         pd.testing.assert_frame_equal(pd.DataFrame(extracted_data), mock_validate.call_args[0][0])
-        mock_makedirs.assert_any_call("data/processed", exist_ok=True)
-        mock_logger.info.assert_any_call(f"Saving {player_id} results DataFrame with {len(extracted_data)} rows to Parquet file.")
+        mock_makedirs.assert_not_called()
+        mock_logger.debug.assert_any_call("Saving %s results DataFrame with %d rows to Parquet file.", player_id, len(extracted_data))
         mock_save_parquet.assert_called_once()
-        mock_makedirs.assert_any_call("data/raw", exist_ok=True)
-        mock_logger.info.assert_any_call(f"Saving {player_id} results to json file.")
+        mock_logger.debug.assert_any_call("Saving %s results to json file.", player_id)
         mock_save_json.assert_called_once_with(results, f"data/raw/player_{player_id}_results.json")
 
     @patch('src.processing.data_saver._save_json')
@@ -498,11 +586,9 @@ class TestSavePlayerResults(unittest.TestCase):
         mock_logger.warning.assert_called_once_with("Results DataFrame is empty.")
         mock_save_parquet.assert_not_called()
         mock_makedirs.assert_not_called()
-        expected_parquet_log_message = f"Saving {player_id} results DataFrame with 0 rows to Parquet file."
-        self.assertNotIn(unittest.mock.call(expected_parquet_log_message), mock_logger.info.call_args_list)
+        self.assertNotIn(unittest.mock.call("Saving %s results DataFrame with %d rows to Parquet file.", player_id, 0), mock_logger.debug.call_args_list)
         mock_save_json.assert_not_called()
-        expected_json_log_message = f"Saving {player_id} results to json file."
-        self.assertNotIn(unittest.mock.call(expected_json_log_message), mock_logger.info.call_args_list)
+        self.assertNotIn(unittest.mock.call("Saving %s results to json file.", player_id), mock_logger.debug.call_args_list)
 
     @patch('src.processing.data_saver._save_json')
     @patch('src.processing.data_saver._save_parquet')
@@ -529,8 +615,7 @@ class TestSavePlayerResults(unittest.TestCase):
         mock_save_parquet.assert_not_called()
         mock_makedirs.assert_not_called()
         mock_save_json.assert_not_called()
-        expected_json_log_message = f"Saving {player_id} results to json file."
-        self.assertNotIn(unittest.mock.call(expected_json_log_message), mock_logger.info.call_args_list)
+        self.assertNotIn(unittest.mock.call("Saving %s results to json file.", player_id), mock_logger.debug.call_args_list)
 
     @patch('src.processing.data_saver._save_json')
     @patch('src.processing.data_saver._save_parquet')
@@ -559,7 +644,7 @@ class TestSavePlayerResults(unittest.TestCase):
         mock_extract.assert_called_once_with(results)
         mock_validate.assert_called_once()
         pd.testing.assert_frame_equal(pd.DataFrame(extracted_data), mock_validate.call_args[0][0])
-        mock_makedirs.assert_any_call("data/processed", exist_ok=True)
+        mock_makedirs.assert_not_called()
         mock_logger.error.assert_called_once_with(f"Error saving results for player {player_id}: {parquet_error_message}")
         mock_save_json.assert_called_once_with(results, f"data/raw/player_{player_id}_results.json")
 
@@ -590,12 +675,76 @@ class TestSavePlayerResults(unittest.TestCase):
         mock_extract.assert_called_once_with(results)
         mock_validate.assert_called_once()
         pd.testing.assert_frame_equal(pd.DataFrame(extracted_data), mock_validate.call_args[0][0])
-        mock_makedirs.assert_any_call("data/raw", exist_ok=True)
+        mock_makedirs.assert_not_called()
         mock_logger.error.assert_called_once_with(f"Error saving json results for player {player_id}: {json_error_message}")
         mock_save_parquet.assert_called_once()
 
+class TestResultsWriter(unittest.TestCase):
+
+    def _results(self, result_ids):
+        return {"events": [{"id": 1, "name": "Event", "draws": [{"id": "d1", "name": "Draw", "results": [
+            {"id": result_id, "date": "2024-01-01", "players": {"winner1": {"id": 1}, "winner2": None}, "score": {"1": {"winner": 6, "loser": 2}}}
+            for result_id in result_ids
+        ]}]}]}
+
+    def test_results_writer_combines_players(self):
+        """Test that results from several players land in one file, tagged by player_id."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "results.parquet")
+            with patch.object(ResultsWriter, "BATCH_SIZE", 2), ResultsWriter(file_path) as writer:
+                writer.write_results(self._results([10, 11]), "p1")
+                writer.write_results(self._results([12]), 2)
+            table = pa.parquet.read_table(file_path)
+            row_groups = pa.parquet.ParquetFile(file_path).metadata.num_row_groups
+
+        self.assertEqual(table.column("player_id").to_pylist(), ["p1", "p1", "2"])
+        self.assertEqual(table.column("result_id").to_pylist(), [10, 11, 12])
+        self.assertEqual(table.column("players").to_pylist()[0], '{"winner1":{"id":1},"winner2":null}')
+        self.assertEqual(row_groups, 2)
+
+    def test_results_writer_streams_results_file(self):
+        """Test that a raw results file is streamed into row groups of at most BATCH_SIZE rows."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = os.path.join(tmp_dir, "player_p1_results.json")
+            with open(json_path, "w") as f:
+                json.dump(self._results([10, 11, 12]), f)
+            file_path = os.path.join(tmp_dir, "results.parquet")
+            with patch.object(ResultsWriter, "BATCH_SIZE", 2), ResultsWriter(file_path) as writer:
+                writer.write_results_file(json_path, "p1")
+            table = pa.parquet.read_table(file_path)
+            row_groups = pa.parquet.ParquetFile(file_path).metadata.num_row_groups
+
+        self.assertEqual(table.column("result_id").to_pylist(), [10, 11, 12])
+        self.assertEqual(table.column("score").to_pylist()[0], '{"1":{"winner":6,"loser":2}}')
+        self.assertEqual(row_groups, 2)
+
+    @patch('src.processing.data_saver.logger')
+    def test_results_writer_skips_mistyped_player(self, mock_logger):
+        """Test that a player whose results don't match the schema is skipped and logged."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "results.parquet")
+            with ResultsWriter(file_path) as writer:
+                writer.write_results(self._results(["not-an-int"]), "p1")
+                writer.write_results(self._results([10]), "p2")
+            table = pa.parquet.read_table(file_path)
+
+        self.assertEqual(table.column("player_id").to_pylist(), ["p2"])
+        mock_logger.error.assert_called_once()
+
 class TestSavePlayerProfile(unittest.TestCase):
 
+    def setUp(self):
+        """Point the players database at a temporary directory that counts as already created."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.addCleanup(data_saver.close_connections)
+        for patcher in (
+            patch.object(data_saver, "PLAYERS_DB_FILE", os.path.join(temp_dir.name, "players.db")),
+            patch.object(data_saver, "_created_dirs", {temp_dir.name}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
     @patch('src.processing.data_saver._save_json')
     @patch('src.processing.data_saver._save_parquet')
     @patch('src.processing.data_saver.logger')
@@ -613,12 +762,11 @@ class TestSavePlayerProfile(unittest.TestCase):
         save_player_profile(profile, player_id)
 
         mock_logger.info.assert_any_call(f"Saving profile for player ID: {player_id}.")
-        pd.testing.assert_frame_equal(pd.DataFrame([profile]), mock_save_parquet.call_args[0][0])
-        mock_makedirs.assert_any_call("data/processed", exist_ok=True)
-        mock_logger.info.assert_any_call(f"Saving {player_id} profile to Parquet file.")
+        self.assertEqual(mock_save_parquet.call_args[0][0].to_pylist(), [profile])
+        mock_makedirs.assert_not_called()
+        mock_logger.debug.assert_any_call("Saving %s profile to Parquet file.", player_id)
         mock_save_parquet.assert_called_once()
-        mock_makedirs.assert_any_call("data/raw", exist_ok=True)
-        mock_logger.info.assert_any_call(f"Saving {player_id} profile to json file.")
+        mock_logger.debug.assert_any_call("Saving %s profile to json file.", player_id)
         mock_save_json.assert_called_once_with(profile, f"data/raw/player_{player_id}_profile.json")
 
     @patch('src.processing.data_saver._save_json')
@@ -640,8 +788,8 @@ class TestSavePlayerProfile(unittest.TestCase):
         save_player_profile(profile, player_id)
 
         mock_logger.info.assert_any_call(f"Saving profile for player ID: {player_id}.")
-        pd.testing.assert_frame_equal(pd.DataFrame([profile]), mock_save_parquet.call_args[0][0])
-        mock_makedirs.assert_any_call("data/processed", exist_ok=True)
+        self.assertEqual(mock_save_parquet.call_args[0][0].to_pylist(), [profile])
+        mock_makedirs.assert_not_called()
         mock_logger.error.assert_called_once_with(f"Error saving parquet profile for player {player_id}: {parquet_error_message}")
         mock_save_json.assert_called_once_with(profile, f"data/raw/player_{player_id}_profile.json")
 
@@ -664,12 +812,63 @@ class TestSavePlayerProfile(unittest.TestCase):
         save_player_profile(profile, player_id)
 
         mock_logger.info.assert_any_call(f"Saving profile for player ID: {player_id}.")
-        pd.testing.assert_frame_equal(pd.DataFrame([profile]), mock_save_parquet.call_args[0][0])
-        mock_makedirs.assert_any_call("data/raw", exist_ok=True)
+        self.assertEqual(mock_save_parquet.call_args[0][0].to_pylist(), [profile])
+        mock_makedirs.assert_not_called()
         mock_logger.error.assert_called_once_with(f"Error saving json profile for player {player_id}: {json_error_message}")
         mock_save_parquet.assert_called_once()
     pass
 
+class TestSavePlayerProfilesBulk(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary players database file."""
+        self.temp_db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        self.db_file = self.temp_db_file.name
+        self.temp_db_file.close()
+
+    def tearDown(self):
+        """Clean up by closing cached connections and deleting the temporary database file."""
+        data_saver.close_connections()
+        os.remove(self.db_file)
+
+    def _fetch_players(self):
+        conn = sqlite3.connect(self.db_file)
+        rows = conn.execute("SELECT id, firstName, lastName, myUtrSingles FROM players ORDER BY id").fetchall()
+        conn.close()
+        return rows
+
+    def test_save_player_profiles_bulk(self):
+        """Test that all profiles are written and re-saving a profile replaces it."""
+        profiles = [
+            {"id": "p1", "firstName": "Alpha", "lastName": "One", "myUtrSingles": 5.5, "extra": "ignored"},
+            {"id": "p2", "firstName": "Beta", "lastName": "Two"},
+        ]
+        with patch('src.processing.data_saver.PLAYERS_DB_FILE', self.db_file):
+            save_player_profiles_bulk(profiles)
+            save_player_profiles_bulk(iter([{"id": "p2", "firstName": "Beta", "lastName": "Updated"}]))
+
+        self.assertEqual(self._fetch_players(), [("p1", "Alpha", "One", 5.5), ("p2", "Beta", "Updated", None)])
+
+    @patch('src.processing.data_saver.logger')
+    def test_save_player_profiles_bulk_rolls_back_on_error(self, mock_logger):
+        """Test that a failing row rolls back the whole batch."""
+        profiles = [{"id": "p1"}, {"id": "p2", "firstName": ["not", "bindable"]}]
+        with patch('src.processing.data_saver.PLAYERS_DB_FILE', self.db_file):
+            save_player_profiles_bulk(profiles)
+
+        mock_logger.error.assert_called_once()
+        self.assertEqual(self._fetch_players(), [])
+
+    def test_save_player_profiles_bulk_rolls_back_on_other_errors(self):
+        """Test that a non-SQLite error while building rows propagates and releases the write lock."""
+        with patch('src.processing.data_saver.PLAYERS_DB_FILE', self.db_file):
+            with self.assertRaises(AttributeError):
+                save_player_profiles_bulk([{"id": "p1"}, "not a profile"])
+            self.assertFalse(data_saver.get_conn(self.db_file).in_transaction)
+            save_player_profiles_bulk([{"id": "p2"}])
+
+        self.assertEqual(self._fetch_players(), [("p2", None, None, None)])
+
 class TestTeamManager(unittest.TestCase):
 
     def setUp(self):
@@ -688,7 +887,8 @@ class TestTeamManager(unittest.TestCase):
         self._populate_test_players_table()
 
     def tearDown(self):
-        """Clean up by deleting the temporary database files."""
+        """Clean up by closing cached connections and deleting the temporary database files."""
+        close_connections()
         os.remove(self.teams_db_file)
         os.remove(self.players_db_file)
 
@@ -718,7 +918,7 @@ class TestTeamManager(unittest.TestCase):
         self.assertIsInstance(team, Team)
         self.assertEqual(team.team_number, team_number)
         self.assertEqual(team.name, name)
-        self.assertEqual(team.players, [])
+        self.assertEqual(team.get_roster(), [])
 
         # Verify the team is in the database
         conn = sqlite3.connect(self.team_manager.db_file)
@@ -795,7 +995,7 @@ class TestTeamManager(unittest.TestCase):
         self.assertEqual(retrieved_team.season, season)
         self.assertEqual(retrieved_team.flight, flight)
         self.assertEqual(retrieved_team.name, name)
-        self.assertEqual(retrieved_team.players, [])
+        self.assertEqual(retrieved_team.get_roster(), [])
 
     def test_add_player_to_team(self):
         """Test adding players to a team and verifying the roster."""
@@ -952,6 +1152,39 @@ class TestTeamManager(unittest.TestCase):
 
         self.assertEqual(count, 1)
 
+    def test_add_player_to_team_object(self):
+        """Test that passing a Team updates it in place as well as the database."""
+        team = self.team_manager.create_team("OBJ_TEAM", 2024, "Adult 18 & Over", "Section A", "District 1", "Area X", "Spring", "Flight 1", "Object Team")
+
+        self.team_manager.add_player_to_team(team, "player_a")
+        self.team_manager.add_player_to_team(team, "player_b")
+        self.team_manager.remove_player_from_team(team, "player_a")
+
+        self.assertEqual(team.get_roster(), ["player_b"])
+        self.assertEqual(self.team_manager.get_team("OBJ_TEAM").get_roster(), ["player_b"])
+
+    @patch('builtins.print')
+    def test_add_player_to_missing_team(self, mock_print):
+        """Test that a foreign key failure is reported as such, not as a duplicate player."""
+        team = Team("NO_SUCH_TEAM", 2024, "Adult 18 & Over", "Section A", "District 1", "Area X", "Spring", "Flight 1", "Ghost Team")
+
+        self.team_manager.add_player_to_team(team, "player_a")
+
+        self.assertEqual(team.get_roster(), [])
+        message = mock_print.call_args[0][0]
+        self.assertIn("FOREIGN KEY constraint failed", message)
+        self.assertNotIn("already on team", message)
+
+    def test_add_players_to_team_bulk(self):
+        """Test that several players, including one already on the team, are added in one call."""
+        team = self.team_manager.create_team("BULK_TEAM", 2024, "Adult 18 & Over", "Section A", "District 1", "Area X", "Spring", "Flight 1", "Bulk Team")
+        self.team_manager.add_player_to_team("BULK_TEAM", "player_a")
+
+        self.team_manager.add_players_to_team_bulk(team, ["player_a", "player_b", "player_c"])
+
+        self.assertEqual(team.get_roster(), ["player_a", "player_b", "player_c"])
+        self.assertEqual(sorted(self.team_manager.get_team("BULK_TEAM").get_roster()), ["player_a", "player_b", "player_c"])
+
     def test_populate_roster(self):
         """Test populating a team's roster using player IDs from the test database."""
         team_number = "ROSTER_TEAM"
@@ -995,5 +1228,18 @@ class TestTeamManager(unittest.TestCase):
             self.assertNotIn(player_id_3, retrieved_team.players)
             self.assertEqual(len(retrieved_team.players), 2)
 
+    def test_populate_roster_numeric_ids(self):
+        """Test that integer player IDs match profiles stored under their string IDs."""
+        team = self.team_manager.create_team("NUMERIC_TEAM", 2025, "Adult Mixed", "S", "D", "A", "Spr", "F", "Numeric Team")
+        conn = sqlite3.connect(self.players_db_file)
+        conn.execute("INSERT OR IGNORE INTO players (id, firstName) VALUES (?, ?)", ("123", "Numeric"))
+        conn.commit()
+        conn.close()
+
+        with patch('src.player.player_data_loader.PLAYERS_DB_FILE', self.players_db_file):
+            self.team_manager.populate_roster(team, [123, 456])
+
+        self.assertEqual(team.get_roster(), ["123"])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,209 @@
+import unittest
+from unittest.mock import patch
+import json
+import os
+import sqlite3
+import tempfile
+from src.player.player_data_loader import load_player_match_stats, read_player_match_rows, bulk_load_matches, load_multiple_player_profiles_from_db, load_player_profile_from_db, close_connections
+from src.processing.connections import connect
+
+class TestLoadPlayerMatchStats(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary players database and a results JSON file."""
+        self.temp_db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        self.db_file = self.temp_db_file.name
+        self.temp_db_file.close()
+
+        self.player_results = {
+            "events": [
+                {
+                    "draws": [
+                        {
+                            "teamType": "SINGLES",
+                            "results": [
+                                {
+                                    "id": 1,
+                                    "date": "2024-03-01T10:00:00",
+                                    "winner": {"id": "w"}, "loser": {"id": "l"},
+                                    "players": {"winner1": {"id": "p1"}, "loser1": {"id": "p2"}},
+                                    "score": {"1": {"winner": 6, "loser": 3}, "2": {"winner": 6, "loser": 4}}
+                                },
+                                {
+                                    "id": 2,
+                                    "date": "2024-03-02T10:00:00",
+                                    "winner": {"id": "w"}, "loser": {"id": "l"},
+                                    "players": {"winner1": {"id": "p3"}, "loser1": {"id": "p1"}},
+                                    "score": {"1": {"winner": 7, "loser": 5}}
+                                }
+                            ]
+                        },
+                        {
+                            "teamType": "DOUBLES",
+                            "results": [
+                                {
+                                    "id": 3,
+                                    "date": "2024-03-03T10:00:00",
+                                    "winner": {"id": "w"}, "loser": {"id": "l"},
+                                    "players": {
+                                        "winner1": {"id": "p1"}, "winner2": {"id": "p4"},
+                                        "loser1": {"id": "p5"}, "loser2": {"id": "p6"}
+                                    },
+                                    "score": {"1": {"winner": 6, "loser": 2}}
+                                }
+                            ]
+                        }
+                    ]
+                }
+            ]
+        }
+        self.temp_json_file = tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False)
+        json.dump(self.player_results, self.temp_json_file)
+        self.temp_json_file.close()
+        self.json_file = self.temp_json_file.name
+
+    def tearDown(self):
+        """Clean up by deleting the temporary files."""
+        os.remove(self.db_file)
+        os.remove(self.json_file)
+
+    def _fetch_matches(self):
+        conn = sqlite3.connect(self.db_file)
+        rows = conn.execute("SELECT * FROM matches ORDER BY match_id").fetchall()
+        conn.close()
+        return rows
+
+    def test_load_player_match_stats_inserts_all_matches(self):
+        """Test that singles and doubles matches are inserted for the player."""
+        with patch('src.player.player_data_loader.PLAYERS_DB_FILE', self.db_file):
+            load_player_match_stats("p1", self.json_file)
+
+        rows = self._fetch_matches()
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0], ("1", "2024-03-01", "Singles", "6-3, 6-4", "Win", "p1", None, "p2", None))
+        self.assertEqual(rows[1], ("2", "2024-03-02", "Singles", "7-5", "Loss", "p1", None, "p3", None))
+        self.assertEqual(rows[2][:6], ("3", "2024-03-03", "Doubles", "6-2", "Win", "p1"))
+        self.assertEqual(rows[2][6], "p4")
+        self.assertEqual({rows[2][7], rows[2][8]}, {"p5", "p6"})
+
+    def test_load_player_match_stats_ignores_duplicates(self):
+        """Test that loading the same file twice keeps one row per match."""
+        with patch('src.player.player_data_loader.PLAYERS_DB_FILE', self.db_file):
+            load_player_match_stats("p1", self.json_file)
+            load_player_match_stats("p1", self.json_file)
+
+        self.assertEqual(len(self._fetch_matches()), 3)
+
+    def test_load_player_match_stats_executemany_fallback(self):
+        """Test that matches are inserted row-wise when json_each is unavailable."""
+        with patch('src.player.player_data_loader.PLAYERS_DB_FILE', self.db_file), \
+             patch('src.player.player_data_loader.JSON_EACH_SUPPORTED', False):
+            load_player_match_stats("p1", self.json_file)
+
+        rows = self._fetch_matches()
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0], ("1", "2024-03-01", "Singles", "6-3, 6-4", "Win", "p1", None, "p2", None))
+
+    def test_load_player_match_stats_small_batches(self):
+        """Test that rows streamed across several insert batches are all written."""
+        with patch('src.player.player_data_loader.PLAYERS_DB_FILE', self.db_file), \
+             patch('src.player.player_data_loader.MATCH_INSERT_BATCH_SIZE', 1):
+            load_player_match_stats("p1", self.json_file)
+
+        self.assertEqual(len(self._fetch_matches()), 3)
+
+    @patch('src.player.player_data_loader.logger')
+    def test_load_player_match_stats_truncated_json(self, mock_logger):
+        """Test that a truncated file is logged and its partial rows are rolled back."""
+        with open(self.json_file, "r") as f:
+            contents = f.read()
+        with open(self.json_file, "w") as f:
+            f.write(contents[:contents.index('"DOUBLES"')])
+
+        with patch('src.player.player_data_loader.PLAYERS_DB_FILE', self.db_file):
+            load_player_match_stats("p1", self.json_file)
+
+        mock_logger.error.assert_called_once()
+        self.assertTrue(mock_logger.error.call_args[0][0].startswith(f"Error decoding JSON file {self.json_file}"))
+        self.assertEqual(self._fetch_matches(), [])
+
+    def test_bulk_load_matches(self):
+        """Test that rows from several players are merged once per match id."""
+        with patch('src.player.player_data_loader.PLAYERS_DB_FILE', self.db_file):
+            p1_rows = read_player_match_rows("p1", self.json_file)
+            # p2 sees the same first singles match from the other side
+            p2_rows = read_player_match_rows("p2", self.json_file)
+            inserted = bulk_load_matches([("p1", p1_rows), ("p2", iter(p2_rows))])
+
+        self.assertEqual(inserted, 3)
+        rows = self._fetch_matches()
+        self.assertEqual([row[0] for row in rows], ["1", "2", "3"])
+        self.assertEqual(rows[0][5], "p1")
+
+    @patch('src.player.player_data_loader.logger')
+    def test_load_player_match_stats_missing_file(self, mock_logger):
+        """Test that a missing file is logged and nothing is inserted."""
+        with patch('src.player.player_data_loader.PLAYERS_DB_FILE', self.db_file):
+            load_player_match_stats("p1", "missing_file.json")
+
+        mock_logger.error.assert_called_once_with("Match stats JSON file not found: missing_file.json")
+        self.assertEqual(self._fetch_matches(), [])
+
+class TestLoadMultiplePlayerProfiles(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary players database with a few profiles."""
+        self.temp_db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        self.db_file = self.temp_db_file.name
+        self.temp_db_file.close()
+
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("""
+            CREATE TABLE players (
+                id TEXT PRIMARY KEY, firstName TEXT, lastName TEXT, gender TEXT, birthDate TEXT,
+                ageRange TEXT, displayName TEXT, myUtrSingles REAL, myUtrDoubles REAL, descriptionShort TEXT
+            )
+        """)
+        conn.executemany("INSERT INTO players (id, firstName, lastName) VALUES (?, ?, ?)",
+                         [("p1", "Alpha", "One"), ("p2", "Beta", "Two"), ("p3", "Gamma", "Three")])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        """Clean up by closing cached connections and deleting the temporary database file."""
+        close_connections()
+        os.remove(self.db_file)
+
+    def test_load_multiple_player_profiles_skips_unknown_ids(self):
+        """Test that only profiles present in the database are returned."""
+        with patch('src.player.player_data_loader.PLAYERS_DB_FILE', self.db_file):
+            profiles = load_multiple_player_profiles_from_db(["p1", "p3", "missing"])
+
+        self.assertEqual(set(profiles), {"p1", "p3"})
+        self.assertEqual(profiles["p1"]["firstName"], "Alpha")
+        self.assertEqual(profiles["p3"]["lastName"], "Three")
+
+    def test_load_multiple_player_profiles_chunks_ids(self):
+        """Test that ids spanning several IN-query chunks are all loaded."""
+        with patch('src.player.player_data_loader.PLAYERS_DB_FILE', self.db_file), \
+             patch('src.player.player_data_loader.IN_QUERY_CHUNK_SIZE', 2):
+            profiles = load_multiple_player_profiles_from_db(["p1", "p2", "p3"])
+
+        self.assertEqual(set(profiles), {"p1", "p2", "p3"})
+
+    def test_load_player_profile_reuses_connection(self):
+        """Test that repeated lookups on one thread share a single connection."""
+        with patch('src.player.player_data_loader.PLAYERS_DB_FILE', self.db_file), \
+             patch('src.processing.connections.connect', wraps=connect) as mock_connect:
+            self.assertEqual(load_player_profile_from_db("p1")["firstName"], "Alpha")
+            self.assertEqual(load_player_profile_from_db("p2")["firstName"], "Beta")
+            self.assertIsNone(load_player_profile_from_db("missing"))
+
+        mock_connect.assert_called_once()
+
+    def test_load_multiple_player_profiles_empty(self):
+        """Test that an empty id list returns an empty dict."""
+        self.assertEqual(load_multiple_player_profiles_from_db([]), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,8 @@ from src.api.utr_api import UTRAPI
 from unittest.mock import patch, MagicMock
 import requests
 import json
+import os
+import tempfile
 
 class TestUTRAPI(unittest.TestCase):
 
@@ -16,6 +18,13 @@ class TestUTRAPI(unittest.TestCase):
         """Clean up after test methods."""
         pass
 
+    def test_session_mounts_retrying_adapter(self):
+        """Test that HTTPS requests go through a pooled adapter with retries."""
+        adapter = self.api.session.get_adapter("https://api.utrsports.net")
+        self.assertEqual(adapter.max_retries.total, 3)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+        self.assertEqual(adapter._pool_maxsize, 16)
+
     @patch('requests.Session.post')
     def test_authentication_successful(self, mock_post):
         """Test successful authentication."""
@@ -58,7 +67,7 @@ class TestUTRAPI(unittest.TestCase):
         """Test successful search returning a single player."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             "hits": [{
                 "source": {
                     "displayName": "John Doe",
@@ -67,7 +76,7 @@ class TestUTRAPI(unittest.TestCase):
                 }
             }],
             "total": 1
-        }
+        }).encode()
         mock_get.return_value = mock_response
 
         player_name = "John Doe"
@@ -80,19 +89,32 @@ class TestUTRAPI(unittest.TestCase):
         mock_get.assert_called_once()
         mock_ensure_auth.assert_called_once()
 
+    @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
+    @patch('requests.Session.get')
+    def test_search_player_limit_sets_top(self, mock_get, mock_ensure_auth):
+        """Test that the limit argument is sent to the server as the 'top' parameter."""
+        mock_response = MagicMock()
+        mock_response.content = json.dumps({"hits": [{"source": {"displayName": "John Doe", "id": "johndoe123"}}]}).encode()
+        mock_get.return_value = mock_response
+
+        result = self.api.search_player("John Doe", limit=1)
+
+        self.assertEqual(result["id"], "johndoe123")
+        self.assertEqual(mock_get.call_args.kwargs["params"]["top"], 1)
+
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
     @patch('requests.Session.get')
     def test_search_player_successful_multiple_results_select_first(self, mock_get, mock_ensure_auth):
         """Test successful search returning multiple players (implicitly selects the first)."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             "hits": [
                 {"source": {"displayName": "Jane Smith", "id": "janesmith456", "location": {"display": "London, UK"}}},
                 {"source": {"displayName": "Jane Smith", "id": "janesmith789", "location": {"display": "Paris, France"}}}
             ],
             "total": 2
-        }
+        }).encode()
         mock_get.return_value = mock_response
 
         player_name = "Jane Smith"
@@ -113,7 +135,7 @@ class TestUTRAPI(unittest.TestCase):
         """Test search returning no players."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"hits": [], "total": 0}
+        mock_response.content = json.dumps({"hits": [], "total": 0}).encode()
         mock_get.return_value = mock_response
 
         player_name = "Nonexistent Player"
@@ -168,7 +190,7 @@ class TestUTRAPI(unittest.TestCase):
         """Test successful retrieval of a player profile."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"id": "johndoe123", "displayName": "John Doe", "utr": 12.5}
+        mock_response.content = json.dumps({"id": "johndoe123", "displayName": "John Doe", "utr": 12.5}).encode()
         mock_get.return_value = mock_response
 
         player_id = "johndoe123"
@@ -178,7 +200,7 @@ class TestUTRAPI(unittest.TestCase):
         self.assertEqual(result['id'], "johndoe123")
         self.assertEqual(result['displayName'], "John Doe")
         self.assertEqual(result['utr'], 12.5)
-        mock_get.assert_called_once_with(self.api.profile_url.format(player_id=player_id))
+        mock_get.assert_called_once_with(UTRAPI._profile_url(player_id))
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
@@ -194,7 +216,7 @@ class TestUTRAPI(unittest.TestCase):
         result = self.api.get_player_profile(player_id)
 
         self.assertIsNone(result)
-        mock_get.assert_called_once_with(self.api.profile_url.format(player_id=player_id))
+        mock_get.assert_called_once_with(UTRAPI._profile_url(player_id))
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
@@ -210,7 +232,7 @@ class TestUTRAPI(unittest.TestCase):
         result = self.api.get_player_profile(player_id)
 
         self.assertIsNone(result)
-        mock_get.assert_called_once_with(self.api.profile_url.format(player_id=player_id))
+        mock_get.assert_called_once_with(UTRAPI._profile_url(player_id))
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
@@ -223,7 +245,7 @@ class TestUTRAPI(unittest.TestCase):
         result = self.api.get_player_profile(player_id)
 
         self.assertIsNone(result)
-        mock_get.assert_called_once_with(self.api.profile_url.format(player_id=player_id))
+        mock_get.assert_called_once_with(UTRAPI._profile_url(player_id))
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=False)
@@ -242,7 +264,7 @@ class TestUTRAPI(unittest.TestCase):
         """Test successful retrieval of player results."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"events": [{"name": "Match 1"}, {"name": "Match 2"}]}
+        mock_response.content = json.dumps({"events": [{"name": "Match 1"}, {"name": "Match 2"}]}).encode()
         mock_get.return_value = mock_response
 
         player_id = "someplayer"
@@ -252,16 +274,31 @@ class TestUTRAPI(unittest.TestCase):
         self.assertIsInstance(result, dict)
         self.assertIn("events", result)
         self.assertEqual(len(result["events"]), 2)
-        mock_get.assert_called_once_with(self.api.results_url.format(player_id=player_id))
+        mock_get.assert_called_once_with(UTRAPI._results_url(player_id))
         mock_ensure_auth.assert_called_once()
 
+    @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
+    @patch('requests.Session.get')
+    def test_get_player_results_raw_returns_body(self, mock_get, mock_ensure_auth):
+        """Test that the raw variant returns the response body without decoding it."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.content = b'{"events": []}'
+        mock_get.return_value = mock_response
+
+        player_id = "someplayer"
+        result = self.api.get_player_results_raw(player_id)
+
+        self.assertEqual(result, b'{"events": []}')
+        mock_get.assert_called_once_with(UTRAPI._results_url(player_id))
+
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
     @patch('requests.Session.get')
     def test_get_player_results_no_results(self, mock_get, mock_ensure_auth):
         """Test when the API returns no results for the player."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"events": []}
+        mock_response.content = json.dumps({"events": []}).encode()
         mock_get.return_value = mock_response
 
         player_id = "anotherplayer"
@@ -270,7 +307,7 @@ class TestUTRAPI(unittest.TestCase):
         self.assertIsNotNone(result)
         self.assertIsInstance(result, dict)
         self.assertEqual(result["events"], [])
-        mock_get.assert_called_once_with(self.api.results_url.format(player_id=player_id))
+        mock_get.assert_called_once_with(UTRAPI._results_url(player_id))
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
@@ -286,7 +323,7 @@ class TestUTRAPI(unittest.TestCase):
         result = self.api.get_player_results(player_id)
 
         self.assertIsNone(result)
-        mock_get.assert_called_once_with(self.api.results_url.format(player_id=player_id))
+        mock_get.assert_called_once_with(UTRAPI._results_url(player_id))
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
@@ -302,7 +339,7 @@ class TestUTRAPI(unittest.TestCase):
         result = self.api.get_player_results(player_id)
 
         self.assertIsNone(result)
-        mock_get.assert_called_once_with(self.api.results_url.format(player_id=player_id))
+        mock_get.assert_called_once_with(UTRAPI._results_url(player_id))
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
@@ -315,7 +352,7 @@ class TestUTRAPI(unittest.TestCase):
         result = self.api.get_player_results(player_id)
 
         self.assertIsNone(result)
-        mock_get.assert_called_once_with(self.api.results_url.format(player_id=player_id))
+        mock_get.assert_called_once_with(UTRAPI._results_url(player_id))
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=False)
@@ -334,7 +371,7 @@ class TestUTRAPI(unittest.TestCase):
         """Test successful retrieval of doubles stats."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"stats": [{"type": "doubles", "wins": 10}]}
+        mock_response.content = json.dumps({"stats": [{"type": "doubles", "wins": 10}]}).encode()
         mock_get.return_value = mock_response
 
         player_id = "someplayer"
@@ -344,7 +381,7 @@ class TestUTRAPI(unittest.TestCase):
         self.assertIsInstance(result, dict)
         self.assertIn("stats", result)
         self.assertEqual(result["stats"][0]["type"], "doubles")
-        mock_get.assert_called_once_with(self.api.stats_url.format(player_id=player_id), params={"type": "doubles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
+        mock_get.assert_called_once_with(UTRAPI._stats_url(player_id), params={"type": "doubles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
@@ -353,7 +390,7 @@ class TestUTRAPI(unittest.TestCase):
         """Test successful retrieval of singles stats."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"stats": [{"type": "singles", "wins": 15}]}
+        mock_response.content = json.dumps({"stats": [{"type": "singles", "wins": 15}]}).encode()
         mock_get.return_value = mock_response
 
         player_id = "anotherplayer"
@@ -363,7 +400,7 @@ class TestUTRAPI(unittest.TestCase):
         self.assertIsInstance(result, dict)
         self.assertIn("stats", result)
         self.assertEqual(result["stats"][0]["type"], "singles")
-        mock_get.assert_called_once_with(self.api.stats_url.format(player_id=player_id), params={"type": "singles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
+        mock_get.assert_called_once_with(UTRAPI._stats_url(player_id), params={"type": "singles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
@@ -372,7 +409,7 @@ class TestUTRAPI(unittest.TestCase):
         """Test when the API returns no doubles stats."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"stats": []}
+        mock_response.content = json.dumps({"stats": []}).encode()
         mock_get.return_value = mock_response
 
         player_id = "noplaysdoubles"
@@ -381,7 +418,7 @@ class TestUTRAPI(unittest.TestCase):
         self.assertIsNotNone(result)
         self.assertIsInstance(result, dict)
         self.assertEqual(result["stats"], [])
-        mock_get.assert_called_once_with(self.api.stats_url.format(player_id=player_id), params={"type": "doubles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
+        mock_get.assert_called_once_with(UTRAPI._stats_url(player_id), params={"type": "doubles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
@@ -390,7 +427,7 @@ class TestUTRAPI(unittest.TestCase):
         """Test when the API returns no singles stats."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"stats": []}
+        mock_response.content = json.dumps({"stats": []}).encode()
         mock_get.return_value = mock_response
 
         player_id = "noplayssingles"
@@ -399,7 +436,7 @@ class TestUTRAPI(unittest.TestCase):
         self.assertIsNotNone(result)
         self.assertIsInstance(result, dict)
         self.assertEqual(result["stats"], [])
-        mock_get.assert_called_once_with(self.api.stats_url.format(player_id=player_id), params={"type": "singles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
+        mock_get.assert_called_once_with(UTRAPI._stats_url(player_id), params={"type": "singles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
@@ -415,7 +452,7 @@ class TestUTRAPI(unittest.TestCase):
         result = self.api.get_player_stats(player_id, "doubles")
 
         self.assertIsNone(result)
-        mock_get.assert_called_once_with(self.api.stats_url.format(player_id=player_id), params={"type": "doubles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
+        mock_get.assert_called_once_with(UTRAPI._stats_url(player_id), params={"type": "doubles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
@@ -431,7 +468,7 @@ class TestUTRAPI(unittest.TestCase):
         result = self.api.get_player_stats(player_id, "singles")
 
         self.assertIsNone(result)
-        mock_get.assert_called_once_with(self.api.stats_url.format(player_id=player_id), params={"type": "singles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
+        mock_get.assert_called_once_with(UTRAPI._stats_url(player_id), params={"type": "singles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
@@ -447,7 +484,7 @@ class TestUTRAPI(unittest.TestCase):
         result = self.api.get_player_stats(player_id, "doubles")
 
         self.assertIsNone(result)
-        mock_get.assert_called_once_with(self.api.stats_url.format(player_id=player_id), params={"type": "doubles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
+        mock_get.assert_called_once_with(UTRAPI._stats_url(player_id), params={"type": "doubles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
@@ -463,7 +500,7 @@ class TestUTRAPI(unittest.TestCase):
         result = self.api.get_player_stats(player_id, "singles")
 
         self.assertIsNone(result)
-        mock_get.assert_called_once_with(self.api.stats_url.format(player_id=player_id), params={"type": "singles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
+        mock_get.assert_called_once_with(UTRAPI._stats_url(player_id), params={"type": "singles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
@@ -476,7 +513,7 @@ class TestUTRAPI(unittest.TestCase):
         result = self.api.get_player_stats(player_id, "doubles")
 
         self.assertIsNone(result)
-        mock_get.assert_called_once_with(self.api.stats_url.format(player_id=player_id), params={"type": "doubles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
+        mock_get.assert_called_once_with(UTRAPI._stats_url(player_id), params={"type": "doubles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
@@ -489,7 +526,7 @@ class TestUTRAPI(unittest.TestCase):
         result = self.api.get_player_stats(player_id, "singles")
 
         self.assertIsNone(result)
-        mock_get.assert_called_once_with(self.api.stats_url.format(player_id=player_id), params={"type": "singles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
+        mock_get.assert_called_once_with(UTRAPI._stats_url(player_id), params={"type": "singles", "resultType": "verified", "months": 12, "fetchAllResults": "false"})
         mock_ensure_auth.assert_called_once()
 
     @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=False)
@@ -504,5 +541,108 @@ class TestUTRAPI(unittest.TestCase):
         self.assertEqual(mock_ensure_auth.call_count, 2)
         # We don't assert mock_get here because it shouldn't be called if not authenticated
 
+    @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
+    @patch('requests.Session.get')
+    def test_response_cache_serves_repeat_lookups(self, mock_get, mock_ensure_auth):
+        """Test that with a TTL set, repeat fetches are served from memory and then from disk."""
+        mock_response = MagicMock()
+        mock_response.content = json.dumps({"id": "someplayer", "firstName": "Test"}).encode()
+        mock_response.status_code = 200
+        mock_response.headers = {}
+        mock_get.return_value = mock_response
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_path = os.path.join(tmp_dir, "cache.sqlite")
+            self.api.cache_ttl = 60
+            self.api.cache_path = cache_path
+
+            first = self.api.get_player_profile("someplayer")
+            second = self.api.get_player_profile("someplayer")
+
+            other = UTRAPI()
+            other.cache_ttl = 60
+            other.cache_path = cache_path
+            third = other.get_player_profile("someplayer")
+            self.api._cache_conn.close()
+            other._cache_conn.close()
+
+        self.assertEqual(first, {"id": "someplayer", "firstName": "Test"})
+        self.assertEqual(second, first)
+        self.assertEqual(third, first)
+        mock_get.assert_called_once()
+
+    @patch('src.api.utr_api.UTRAPI._ensure_authenticated', return_value=True)
+    @patch('requests.Session.get')
+    def test_response_cache_serves_raw_fetches(self, mock_get, mock_ensure_auth):
+        """Test that the raw body getters main forwards from are cached too."""
+        mock_get.return_value = MagicMock(status_code=200, content=b'{"results": []}', headers={})
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.api.cache_ttl = 60
+            self.api.cache_path = os.path.join(tmp_dir, "cache.sqlite")
+            first = self.api.get_player_results_raw("someplayer")
+            second = self.api.get_player_results_raw("someplayer")
+            decoded = self.api.get_player_results("someplayer")
+            self.api._cache_conn.close()
+
+        self.assertEqual(first, b'{"results": []}')
+        self.assertEqual(second, first)
+        self.assertEqual(decoded, {"results": []})
+        mock_get.assert_called_once()
+
+    @patch('src.api.utr_api.MEMORY_CACHE_SIZE', 2)
+    def test_memory_cache_evicts_least_recently_used(self):
+        """Test that the in-memory cache holds at most MEMORY_CACHE_SIZE bodies."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.api.cache_ttl = 60
+            self.api.cache_path = os.path.join(tmp_dir, "cache.sqlite")
+            self.api._cache_put("a", b"1")
+            self.api._cache_put("b", b"2")
+            self.api._cache_get("a")
+            self.api._cache_put("c", b"3")
+            self.assertEqual(list(self.api._memory_cache), ["a", "c"])
+            # Evicted bodies are still served from disk
+            self.assertEqual(self.api._cache_get("b"), b"2")
+            self.api._cache_conn.close()
+
+    @patch('requests.Session.get')
+    def test_fetch_revalidates_with_etag(self, mock_get):
+        """Test that a stored ETag is sent back and a 304 reuses the stored body."""
+        first = MagicMock(status_code=200, content=b'{"id": "someplayer"}', headers={"ETag": '"v1"'})
+        second = MagicMock(status_code=304, content=b'', headers={})
+        mock_get.side_effect = [first, second]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.api.cache_ttl = 60
+            self.api.cache_path = os.path.join(tmp_dir, "cache.sqlite")
+            url = UTRAPI._profile_url("someplayer")
+
+            body_first = self.api._fetch(url)
+            body_second = self.api._fetch(url)
+            self.api._cache_conn.close()
+
+        self.assertEqual(body_first, b'{"id": "someplayer"}')
+        self.assertEqual(body_second, b'{"id": "someplayer"}')
+        self.assertNotIn("headers", mock_get.call_args_list[0].kwargs)
+        self.assertEqual(mock_get.call_args_list[1].kwargs["headers"], {"If-None-Match": '"v1"'})
+
+    @patch('src.api.utr_api.UTRAPI._authenticate', return_value=True)
+    def test_ensure_authenticated_logs_in_only_when_expired(self, mock_authenticate):
+        """Test that a live session is reused and an expired one triggers a single login."""
+        self.api.authenticated = True
+        self.api._auth_expires_at = float("inf")
+        self.assertTrue(self.api._ensure_authenticated())
+        mock_authenticate.assert_not_called()
+
+        self.api._auth_expires_at = 0.0
+        self.assertTrue(self.api._ensure_authenticated())
+        mock_authenticate.assert_called_once()
+
+    @patch('src.api.utr_api.UTRAPI._authenticate', return_value=False)
+    def test_ensure_authenticated_reports_failed_login(self, mock_authenticate):
+        """Test that a failed login is reported instead of being treated as success."""
+        self.assertFalse(self.api._ensure_authenticated())
+        mock_authenticate.assert_called_once()
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,8 @@
 import unittest
 from unittest.mock import patch, MagicMock, call
 import pandas as pd
-from src.analytics.utr_service import get_player_utr_scores
+from src.analytics.utr_service import get_player_utr_scores, get_match_utr, _singles_trend_index, _doubles_trend_index, _cached_stats, _cached_profile_tag, clear_caches, PlayerUTRResolver, player_id_lookup, RESULTS_COLUMNS, PROFILE_COLUMNS
+from datetime import datetime
 import json
 
 class TestUTRService(unittest.TestCase):
@@ -14,7 +15,7 @@ class TestUTRService(unittest.TestCase):
             player_id = "test_player"
             result = get_player_utr_scores(player_id)
             self.assertEqual(result, {})
-            mock_load_results.assert_called_once_with(player_id)
+            mock_load_results.assert_called_once_with(player_id, columns=RESULTS_COLUMNS)
 
     @patch('src.analytics.utr_service.load_player_results')
     @patch('src.analytics.utr_service.get_match_utr')
@@ -44,10 +45,10 @@ class TestUTRService(unittest.TestCase):
         self.assertEqual(result, expected_result)
 
         # Assert that our mocks were called correctly
-        mock_load_results.assert_called_once_with(player_id)
+        mock_load_results.assert_called_once_with(player_id, columns=RESULTS_COLUMNS)
         self.assertEqual(mock_get_match_utr.call_count, 2)
-        mock_get_match_utr.assert_any_call(player_id, {'descriptions': [{'resultDate': '2025-03-20T10:00:00Z', 'details': 'Singles Event A'}]}, 'singles')
-        mock_get_match_utr.assert_any_call(player_id, {'descriptions': [{'resultDate': '2025-03-25T15:00:00Z', 'details': 'Singles Event B'}]}, 'singles')
+        mock_get_match_utr.assert_any_call(player_id, datetime(2025, 3, 20).date(), 'Singles Event A', 'singles')
+        mock_get_match_utr.assert_any_call(player_id, datetime(2025, 3, 25).date(), 'Singles Event B', 'singles')
 
     @patch('src.analytics.utr_service.load_player_results')
     @patch('src.analytics.utr_service.get_match_utr')
@@ -77,10 +78,10 @@ class TestUTRService(unittest.TestCase):
         self.assertEqual(result, expected_result)
 
         # Assert that our mocks were called correctly
-        mock_load_results.assert_called_once_with(player_id)
+        mock_load_results.assert_called_once_with(player_id, columns=RESULTS_COLUMNS)
         self.assertEqual(mock_get_match_utr.call_count, 2)
-        mock_get_match_utr.assert_any_call(player_id, {'descriptions': [{'resultDate': '2025-03-20T10:00:00Z', 'details': 'Doubles Event A'}]}, 'doubles')
-        mock_get_match_utr.assert_any_call(player_id, {'descriptions': [{'resultDate': '2025-03-25T15:00:00Z', 'details': 'Doubles Event B'}]}, 'doubles')
+        mock_get_match_utr.assert_any_call(player_id, datetime(2025, 3, 20).date(), 'Doubles Event A', 'doubles')
+        mock_get_match_utr.assert_any_call(player_id, datetime(2025, 3, 25).date(), 'Doubles Event B', 'doubles')
 
     @patch('src.analytics.utr_service.load_player_results')
     @patch('src.analytics.utr_service.get_match_utr')
@@ -110,13 +111,13 @@ class TestUTRService(unittest.TestCase):
         self.assertEqual(result, expected_result)
 
         # Assert that our mocks were called correctly
-        mock_load_results.assert_called_once_with(player_id)
+        mock_load_results.assert_called_once_with(player_id, columns=RESULTS_COLUMNS)
         self.assertEqual(mock_get_match_utr.call_count, 2)
 
         # Assert calls to get_match_utr with correct match_type
         calls = [
-            call(player_id, {'descriptions': [{'resultDate': '2025-03-20T10:00:00Z', 'details': 'Singles Event'}]}, 'singles'),
-            call(player_id, {'descriptions': [{'resultDate': '2025-03-25T15:00:00Z', 'details': 'Doubles Event'}]}, 'doubles')
+            call(player_id, datetime(2025, 3, 20).date(), 'Singles Event', 'singles'),
+            call(player_id, datetime(2025, 3, 25).date(), 'Doubles Event', 'doubles')
         ]
         mock_get_match_utr.assert_has_calls(calls, any_order=False)
 
@@ -149,16 +150,36 @@ class TestUTRService(unittest.TestCase):
         self.assertEqual(result, expected_result)
 
         # Assert that our mocks were called correctly
-        mock_load_results.assert_called_once_with(player_id)
+        mock_load_results.assert_called_once_with(player_id, columns=RESULTS_COLUMNS)
         self.assertEqual(mock_get_match_utr.call_count, 3)
 
         calls = [
-            call(player_id, {'descriptions': [{'resultDate': '2025-03-20T10:00:00Z', 'details': 'Singles A'}]}, 'singles'),
-            call(player_id, {'descriptions': [{'resultDate': '2025-03-25T15:00:00Z', 'details': 'Doubles B'}]}, 'doubles'),
-            call(player_id, {'descriptions': [{'resultDate': '2025-04-01T12:00:00Z', 'details': 'Singles C'}]}, 'singles')
+            call(player_id, datetime(2025, 3, 20).date(), 'Singles A', 'singles'),
+            call(player_id, datetime(2025, 3, 25).date(), 'Doubles B', 'doubles'),
+            call(player_id, datetime(2025, 4, 1).date(), 'Singles C', 'singles')
         ]
         mock_get_match_utr.assert_has_calls(calls, any_order=False)
 
+    @patch('src.analytics.utr_service.load_player_results')
+    @patch('src.analytics.utr_service.get_match_utr')
+    def test_get_player_utr_scores_classifies_compact_json(self, mock_get_match_utr, mock_load_results):
+        """Test that singles are detected in players JSON written without separator spaces."""
+        player_id = "test_player"
+        mock_load_results.return_value = pd.DataFrame({
+            'event_id': ['match1', 'match2'],
+            'players': [
+                '{"winner1":"player_a","loser1":"player_b","winner2":null,"loser2":null}',
+                '{"winner1":"player_a","loser1":"player_b","winner2":"player_c","loser2":"player_d"}'
+            ],
+            'date': ['2025-03-20T10:00:00Z', '2025-03-25T15:00:00Z'],
+            'event_name': ['Event A', 'Event B']
+        })
+        mock_get_match_utr.return_value = None
+
+        get_player_utr_scores(player_id)
+
+        self.assertEqual([c.args[3] for c in mock_get_match_utr.call_args_list], ['singles', 'doubles'])
+
     @patch('src.analytics.utr_service.load_player_results')
     @patch('src.analytics.utr_service.get_match_utr')
     def test_get_player_utr_scores_load_results_returns_none(self, mock_get_match_utr, mock_load_results):
@@ -169,7 +190,7 @@ class TestUTRService(unittest.TestCase):
         result = get_player_utr_scores(player_id)
 
         self.assertEqual(result, {})  # Expect an empty dict as per the function's logic
-        mock_load_results.assert_called_once_with(player_id)
+        mock_load_results.assert_called_once_with(player_id, columns=RESULTS_COLUMNS)
         mock_get_match_utr.assert_not_called()
 
     @patch('src.analytics.utr_service.load_player_results')
@@ -182,8 +203,184 @@ class TestUTRService(unittest.TestCase):
         result = get_player_utr_scores(player_id)
 
         self.assertIsNone(result)  # Expect None due to the try-except block
-        mock_load_results.assert_called_once_with(player_id)
+        mock_load_results.assert_called_once_with(player_id, columns=RESULTS_COLUMNS)
         mock_get_match_utr.assert_not_called()
 
+class TestGetMatchUTRSingles(unittest.TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.stats = {
+            "ratingTrendChart": {
+                "months": [
+                    {"ratings": [{"ratingDisplay": "3.01"}, {"ratingDisplay": "3.05"}], "results": [
+                        {"descriptions": [{"resultDate": "2024-09-21T00:00:00"}]},
+                        {"descriptions": [{"resultDate": "2024-09-28T00:00:00"}]},
+                    ]},
+                    {"ratings": [{"ratingDisplay": "3.20"}], "results": [
+                        {"descriptions": [{"resultDate": "2024-10-05T00:00:00"}]},
+                    ]},
+                    {"ratings": [{"ratingDisplay": "3.30"}], "results": []},
+                ]
+            }
+        }
+
+    def tearDown(self):
+        clear_caches()
+
+    @patch('src.analytics.utr_service.load_player_stats')
+    def test_get_match_utr_singles_uses_month_rating(self, mock_load_stats):
+        """Test that a singles match returns the first rating of the month it was played in."""
+        player_id = "test_player"
+        mock_load_stats.side_effect = lambda pid, match_type: self.stats if match_type == "singles" else None
+
+        self.assertEqual(get_match_utr(player_id, "2024-09-28T00:00:00", None, "singles"), "3.01")
+        self.assertEqual(get_match_utr(player_id, "2024-10-05T00:00:00", None, "singles"), "3.20")
+        self.assertIsNone(get_match_utr(player_id, "2024-11-01T00:00:00", None, "singles"))
+        # The resolver loads singles and doubles stats once each, up front
+        self.assertEqual(mock_load_stats.call_args_list, [call(player_id, "singles"), call(player_id, "doubles")])
+
+    @patch('src.analytics.utr_service.load_player_stats')
+    def test_get_match_utr_singles_skips_month_without_display(self, mock_load_stats):
+        """Test that months whose ratings lack ratingDisplay are skipped instead of failing the index."""
+        self.stats["ratingTrendChart"]["months"].insert(0, {"ratings": [{"rating": 16.02}], "results": [
+            {"descriptions": [{"resultDate": "2024-08-03T00:00:00"}]},
+        ]})
+        mock_load_stats.side_effect = lambda pid, match_type: self.stats if match_type == "singles" else None
+
+        self.assertIsNone(get_match_utr("test_player", "2024-08-03T00:00:00", None, "singles"))
+        self.assertEqual(get_match_utr("test_player", "2024-10-05T00:00:00", None, "singles"), "3.20")
+
+    @patch('src.analytics.utr_service.load_player_stats')
+    def test_get_match_utr_singles_no_stats(self, mock_load_stats):
+        """Test that missing singles stats return None."""
+        mock_load_stats.return_value = None
+
+        result = get_match_utr("test_player", "2024-09-21T00:00:00", None, "singles")
+
+        self.assertIsNone(result)
+
+    @patch('src.analytics.utr_service.load_player_stats')
+    def test_cached_stats_retries_failed_loads(self, mock_load_stats):
+        """Test that a failed stats load isn't cached, while a successful one is."""
+        mock_load_stats.side_effect = [None, self.stats]
+
+        self.assertIsNone(_cached_stats("test_player", "singles"))
+        self.assertEqual(_cached_stats("test_player", "singles"), self.stats)
+        self.assertEqual(_cached_stats("test_player", "singles"), self.stats)
+        self.assertEqual(mock_load_stats.call_count, 2)
+
+    @patch('src.analytics.utr_service.load_player_stats')
+    def test_clear_caches_picks_up_new_stats(self, mock_load_stats):
+        """Test that clearing the caches, as the save path does, serves newly saved ratings."""
+        mock_load_stats.side_effect = lambda pid, match_type: self.stats if match_type == "singles" else None
+        self.assertEqual(get_match_utr("test_player", "2024-10-05T00:00:00", None, "singles"), "3.20")
+
+        self.stats["ratingTrendChart"]["months"][1]["ratings"][0]["ratingDisplay"] = "3.25"
+        clear_caches()
+
+        self.assertEqual(get_match_utr("test_player", "2024-10-05T00:00:00", None, "singles"), "3.25")
+
+class TestGetMatchUTRDoubles(unittest.TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.year = datetime.now().year
+        self.stats = {
+            "ratingTrendChart": {
+                "months": [
+                    {"ratings": [{"ratingDisplay": "2.45"}], "results": [
+                        {"descriptions": [{"details": "Wed Jan 7 Win C.Lynch/J.Milton (2.72/1.96) vs. C.Smith/P.Gibson (2.17/2.71) 6-3, 6-4"}]},
+                        {"descriptions": [{"details": "Thu Jan 8 Loss A.Other/B.Person (3.10/3.20) vs. C.Lynch/D.Partner (2.70/2.80) 6-1, 6-1"}]},
+                    ]},
+                    {"ratings": [], "results": []},
+                ]
+            }
+        }
+
+    def tearDown(self):
+        clear_caches()
+
+    @patch('src.analytics.utr_service.load_player_profile')
+    @patch('src.analytics.utr_service.load_player_stats')
+    def test_get_match_utr_doubles_loads_stats_once(self, mock_load_stats, mock_load_profile):
+        """Test that the doubles trend chart is parsed once and reused across matches."""
+        player_id = "test_player"
+        mock_load_stats.side_effect = lambda pid, match_type: self.stats if match_type == "doubles" else None
+        mock_load_profile.return_value = pd.DataFrame({'firstName': ['Chris'], 'lastName': ['Lynch']})
+
+        first = get_match_utr(player_id, f"{self.year}-01-07T00:00:00", None, "doubles")
+        second = get_match_utr(player_id, f"{self.year}-01-08T00:00:00", None, "doubles")
+
+        self.assertEqual(first, "2.72")
+        self.assertEqual(second, "2.70")
+        self.assertEqual(mock_load_stats.call_args_list, [call(player_id, "singles"), call(player_id, "doubles")])
+
+    @patch('src.analytics.utr_service.load_player_profile')
+    @patch('src.analytics.utr_service.load_player_stats')
+    def test_get_match_utr_doubles_no_match_on_date(self, mock_load_stats, mock_load_profile):
+        """Test that a date missing from the trend chart returns None."""
+        mock_load_stats.side_effect = lambda pid, match_type: self.stats if match_type == "doubles" else None
+        mock_load_profile.return_value = pd.DataFrame({'firstName': ['Chris'], 'lastName': ['Lynch']})
+
+        result = get_match_utr("test_player", f"{self.year}-01-09T00:00:00", None, "doubles")
+
+        self.assertIsNone(result)
+
+    @patch('src.analytics.utr_service.load_player_profile')
+    @patch('src.analytics.utr_service.load_player_stats')
+    def test_resolver_preloads_own_doubles_utrs(self, mock_load_stats, mock_load_profile):
+        """Test that the resolver keeps only dates where the player appears, keyed by date."""
+        mock_load_stats.side_effect = lambda pid, match_type: self.stats if match_type == "doubles" else None
+        mock_load_profile.return_value = pd.DataFrame({'firstName': ['Dana'], 'lastName': ['Partner']})
+
+        resolver = PlayerUTRResolver("test_player")
+
+        self.assertEqual(resolver.doubles, {datetime(self.year, 1, 8).date(): "2.80"})
+        self.assertEqual(resolver.lookup(datetime(self.year, 1, 8).date(), "doubles"), "2.80")
+        self.assertIsNone(resolver.lookup(datetime(self.year, 1, 7).date(), "doubles"))
+
+    @patch('src.analytics.utr_service.load_player_profile')
+    @patch('src.analytics.utr_service.load_player_stats')
+    def test_resolver_doubles_survive_bad_singles_chart(self, mock_load_stats, mock_load_profile):
+        """Test that an unreadable singles chart leaves the doubles index usable."""
+        bad_singles = {"ratingTrendChart": {"months": [{"ratings": [{"ratingDisplay": "3.00"}], "results": [{"descriptions": [{}]}]}]}}
+        mock_load_stats.side_effect = lambda pid, match_type: self.stats if match_type == "doubles" else bad_singles
+        mock_load_profile.return_value = pd.DataFrame({'firstName': ['Chris'], 'lastName': ['Lynch']})
+
+        resolver = PlayerUTRResolver("test_player")
+
+        self.assertEqual(resolver.singles, {})
+        self.assertEqual(resolver.lookup(datetime(self.year, 1, 7).date(), "doubles"), "2.72")
+
+    @patch('src.analytics.utr_service.load_player_stats')
+    def test_get_match_utr_doubles_skips_unparseable_details(self, mock_load_stats):
+        """Test that malformed details strings are skipped when indexing the trend chart."""
+        self.stats["ratingTrendChart"]["months"][0]["results"].insert(0, {"descriptions": [{"details": "no date here"}]})
+        mock_load_stats.side_effect = lambda pid, match_type: self.stats if match_type == "doubles" else None
+
+        index = _doubles_trend_index("test_player")
+
+        self.assertEqual(len(index), 2)
+
+class TestPlayerIdLookup(unittest.TestCase):
+
+    def setUp(self):
+        _cached_profile_tag.cache_clear()
+
+    def tearDown(self):
+        _cached_profile_tag.cache_clear()
+
+    @patch('src.analytics.utr_service.load_player_profile')
+    def test_player_id_lookup_reads_profile_once(self, mock_load_profile):
+        """Test that repeated lookups for the same player only read the profile once."""
+        mock_load_profile.return_value = pd.DataFrame({'firstName': ['Casey'], 'lastName': ['Lynch']})
+
+        self.assertEqual(player_id_lookup("p1", "C.Lynch"), "p1")
+        self.assertIsNone(player_id_lookup("p1", "J.Milton"))
+        self.assertEqual(player_id_lookup("p1", "C.Lynch"), "p1")
+
+        mock_load_profile.assert_called_once_with("p1", columns=PROFILE_COLUMNS)
+
 if __name__ == '__main__':
     unittest.main()